@@ -0,0 +1,13 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def test_side_effects(settings, tmp_path):
+    """Задачи и миниатюры выполняются сразу, файлы — во временном каталоге.
+
+    Иначе поток пула миниатюр пишет в MEDIA_ROOT, пока тест его удаляет,
+    а лента подписок ждёт обработчика очереди.
+    """
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.POSTS_THUMBNAILS_SYNC = True
+    settings.JOBS_SYNC = True
@@ -0,0 +1,20 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'name', 'status', 'attempts', 'run_after', 'key',)
+    search_fields = ('name', 'key',)
+    list_filter = ('status', 'name',)
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        queryset.exclude(status=Job.RUNNING).update(
+            status=Job.PENDING, attempts=0, locked_by='', locked_at=None
+        )
+
+    retry.short_description = 'Выполнить заново'
+
+
+admin.site.register(Job, JobAdmin)
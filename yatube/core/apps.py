@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import sqlite  # noqa: F401
+        from .metrics import instrument_templates
+        instrument_templates()
@@ -0,0 +1,149 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+BODY_IN_MEMORY = 1024 * 1024
+
+
+def build_environ(scope, body):
+    """WSGI environ (PEP 3333) для HTTP-запроса ASGI."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('127.0.0.1', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'REMOTE_ADDR': client[0],
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            # Cookie разделяются точкой с запятой (RFC 6265, 5.4), остальные
+            # повторённые заголовки — запятой (RFC 7230, 3.2.2).
+            separator = '; ' if name == 'HTTP_COOKIE' else ','
+            value = f'{environ[name]}{separator}{value}'
+        environ[name] = value
+    return environ
+
+
+async def read_body(receive):
+    """Тело запроса; большое уходит из памяти во временный файл."""
+    body = SpooledTemporaryFile(max_size=BODY_IN_MEMORY)
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            body.close()
+            return None
+        body.write(message.get('body', b''))
+        if not message.get('more_body', False):
+            break
+    body.seek(0)
+    return body
+
+
+class ASGIHandler:
+    """ASGI-приложение поверх WSGI-обработчика Django.
+
+    Django 2.2 не умеет асинхронные представления, поэтому цикл событий
+    только принимает соединения, а сам запрос выполняется в ограниченном
+    пуле потоков. Чтения (GET, HEAD) и записи идут в разные пулы: медленные
+    записи, ждущие блокировку SQLite, не занимают потоки лент.
+    """
+
+    def __init__(self, wsgi_application, read_threads=None,
+                 write_threads=None):
+        self.wsgi_application = wsgi_application
+        self.read_pool = ThreadPoolExecutor(
+            max_workers=read_threads or settings.ASGI_READ_THREADS,
+            thread_name_prefix='asgi-read',
+        )
+        self.write_pool = ThreadPoolExecutor(
+            max_workers=write_threads or settings.ASGI_WRITE_THREADS,
+            thread_name_prefix='asgi-write',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемый тип соединения: {scope}')
+        body = await read_body(receive)
+        if body is None:
+            return
+        pool = (
+            self.read_pool if scope['method'] in SAFE_METHODS
+            else self.write_pool
+        )
+        loop = asyncio.get_running_loop()
+        with body:
+            await loop.run_in_executor(
+                pool, self.run_wsgi, build_environ(scope, body), loop, send
+            )
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.read_pool.shutdown(wait=False)
+                self.write_pool.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def run_wsgi(self, environ, loop, send):
+        """Выполняется в пуле: части ответа отправляются по мере готовности.
+
+        Поток ждёт отправки каждой части, поэтому потоковые ответы
+        не накапливаются в памяти.
+        """
+        def send_sync(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        response = self.wsgi_application(environ, start_response)
+        try:
+            send_sync({
+                'type': 'http.response.start',
+                'status': started['status'],
+                'headers': started['headers'],
+            })
+            for chunk in response:
+                if chunk:
+                    send_sync({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            send_sync({'type': 'http.response.body', 'body': b''})
+        finally:
+            close = getattr(response, 'close', None)
+            if close is not None:
+                close()
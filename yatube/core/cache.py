@@ -0,0 +1,153 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+MISSING = object()
+
+
+class CacheProxy:
+    """Ленивая ссылка на кэш по алиасу, как django.core.cache.cache."""
+
+    def __init__(self, alias):
+        self._alias = alias
+
+    def __getattr__(self, name):
+        return getattr(caches[self._alias], name)
+
+
+class TwoTierCache(BaseCache):
+    """Кэш процесса (L1, LRU) поверх общего для воркеров кэша (L2).
+
+    Все записи идут в L2, чтение сначала проверяет L1. Значение в L1
+    живёт не дольше L1_TIMEOUT секунд, поэтому изменения из других
+    процессов видны с задержкой не больше L1_TIMEOUT; L1_TIMEOUT = 0
+    отключает L1.
+
+    OPTIONS: SHARED — алиас общего кэша, L1_MAX_ENTRIES, L1_TIMEOUT.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options.get('SHARED', location)
+        self._l1_max_entries = options.get('L1_MAX_ENTRIES', 1000)
+        self._l1_timeout = options.get('L1_TIMEOUT', 5)
+        self._l1 = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _l1_get(self, key, version):
+        key = self.make_key(key, version)
+        with self._lock:
+            value, expires = self._l1.get(key, (MISSING, 0))
+            if value is MISSING:
+                return MISSING
+            if expires < time.monotonic():
+                del self._l1[key]
+                return MISSING
+            self._l1.move_to_end(key)
+            return value
+
+    def _l1_set(self, key, value, timeout, version):
+        timeout = self.get_backend_timeout(timeout)
+        if timeout is None or timeout > self._l1_timeout:
+            timeout = self._l1_timeout
+        key = self.make_key(key, version)
+        with self._lock:
+            if timeout <= 0:
+                self._l1.pop(key, None)
+                return
+            self._l1[key] = (value, time.monotonic() + timeout)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, key, version):
+        with self._lock:
+            self._l1.pop(self.make_key(key, version), None)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version)
+        if added:
+            self._l1_set(key, value, timeout, version)
+        return added
+
+    def get(self, key, default=None, version=None):
+        value = self._l1_get(key, version)
+        if value is not MISSING:
+            return value
+        value = self.shared.get(key, MISSING, version)
+        if value is MISSING:
+            return default
+        self._l1_set(key, value, DEFAULT_TIMEOUT, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = []
+        for key in keys:
+            value = self._l1_get(key, version)
+            if value is MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing:
+            shared = self.shared.get_many(missing, version)
+            for key, value in shared.items():
+                self._l1_set(key, value, DEFAULT_TIMEOUT, version)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version)
+        self._l1_set(key, value, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version)
+        for key, value in data.items():
+            if key not in failed:
+                self._l1_set(key, value, timeout, version)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self._l1_delete(key, version)
+        return self.shared.touch(key, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарен, только если атомарен incr общего кэша.
+
+        У file и db это отдельные чтение и запись, поэтому поколения
+        кэша не считаются через incr.
+        """
+        self._l1_delete(key, version)
+        value = self.shared.incr(key, delta, version)
+        self._l1_set(key, value, DEFAULT_TIMEOUT, version)
+        return value
+
+    def has_key(self, key, version=None):
+        if self._l1_get(key, version) is not MISSING:
+            return True
+        return self.shared.has_key(key, version)
+
+    def delete(self, key, version=None):
+        self._l1_delete(key, version)
+        self.shared.delete(key, version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._l1_delete(key, version)
+        self.shared.delete_many(keys, version)
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+        self.shared.clear()
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
@@ -0,0 +1,85 @@
+import random
+import threading
+
+from django.conf import settings
+from django.db import connections
+
+_state = threading.local()
+
+
+def replica_reads(view):
+    """Помечает представление, чтения которого можно отдать реплике."""
+    view.replica_reads = True
+    return view
+
+
+def use_replica(alias):
+    _state.replica = alias
+    _state.wrote = False
+
+
+def reset():
+    _state.replica = None
+    _state.wrote = False
+
+
+def wrote():
+    return getattr(_state, 'wrote', False)
+
+
+def reading_replica():
+    return getattr(_state, 'replica', None) is not None and not wrote()
+
+
+def cache_timeout(timeout):
+    """Срок жизни в кэше значения, построенного по чтениям этого запроса.
+
+    Реплика может отставать, и её устаревшие строки иначе жили бы в кэше
+    под новым поколением до следующей записи. Поэтому с реплики значение
+    живёт не дольше REPLICA_CACHE_TIMEOUT.
+    """
+    if not reading_replica():
+        return timeout
+    if timeout is None:
+        return settings.REPLICA_CACHE_TIMEOUT
+    return min(timeout, settings.REPLICA_CACHE_TIMEOUT)
+
+
+def choose_replica():
+    """Случайная реплика; реплики с базой default (зеркала в тестах)
+    пропускаются."""
+    primary = connections['default'].settings_dict['NAME']
+    replicas = [
+        alias for alias in settings.DATABASE_REPLICAS
+        if connections[alias].settings_dict['NAME'] != primary
+    ]
+    return random.choice(replicas) if replicas else None
+
+
+class ReplicaRouter:
+    """Чтения помеченных представлений идут на реплику, записи — в default.
+
+    После первой записи в запросе чтения тоже возвращаются в default,
+    чтобы запрос видел собственные изменения. Сессии и таблица
+    DatabaseCache всегда читаются из default.
+    """
+
+    primary_apps = {'sessions', 'django_cache'}
+
+    def db_for_read(self, model, **hints):
+        if wrote() or model._meta.app_label in self.primary_apps:
+            return None
+        return getattr(_state, 'replica', None)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
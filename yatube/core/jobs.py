@@ -0,0 +1,186 @@
+import json
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+TASKS = {}
+
+logger = logging.getLogger(__name__)
+
+# Время последней проверки очереди на застрявшие задачи в этом процессе.
+_stall_checked = 0
+
+
+def task(name):
+    """Регистрирует функцию как задачу очереди под именем name."""
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, key=None, delay=0):
+    """Ставит задачу в очередь в текущей транзакции.
+
+    Задача с уже известным ключом не дублируется: возвращается
+    существующая. С JOBS_SYNC задача выполняется сразу.
+    """
+    if name not in TASKS:
+        raise LookupError(f'Неизвестная задача: {name}')
+    defaults = {
+        'name': name,
+        'payload': json.dumps(payload or {}),
+        'run_after': timezone.now() + timedelta(seconds=delay),
+        'max_attempts': settings.JOBS_MAX_ATTEMPTS,
+    }
+    if key is None:
+        job, created = Job.objects.create(**defaults), True
+    else:
+        job, created = Job.objects.get_or_create(key=key, defaults=defaults)
+    if created and settings.JOBS_SYNC and not delay:
+        job.status = Job.RUNNING
+        job.attempts = 1
+        job.locked_by = 'sync'
+        job.locked_at = timezone.now()
+        job.save()
+        run_job(job)
+    elif created:
+        warn_if_stalled()
+    return job
+
+
+def warn_if_stalled():
+    """Предупреждает, если готовые задачи давно никто не забирает.
+
+    Проверка делается не чаще раза в JOBS_STALL_WARNING секунд на процесс.
+    """
+    global _stall_checked
+    now = timezone.now()
+    if now.timestamp() - _stall_checked < settings.JOBS_STALL_WARNING:
+        return
+    _stall_checked = now.timestamp()
+    border = now - timedelta(seconds=settings.JOBS_STALL_WARNING)
+    stalled = Job.objects.filter(status=Job.PENDING, run_after__lt=border)
+    if stalled.exists():
+        logger.warning(
+            'В очереди есть задачи, ждущие дольше %s с: запустите '
+            'python manage.py run_jobs или включите JOBS_SYNC.',
+            settings.JOBS_STALL_WARNING,
+        )
+
+
+def claim(worker, limit):
+    """Забирает до limit готовых задач для обработчика worker.
+
+    Задачи помечаются одним условным UPDATE, поэтому два обработчика
+    не получат одну задачу и без SELECT ... FOR UPDATE. Задачи упавших
+    обработчиков возвращаются в работу через JOBS_LOCK_TIMEOUT.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    Job.objects.filter(
+        status=Job.RUNNING,
+        locked_at__lt=stale,
+        attempts__gte=F('max_attempts'),
+    ).update(
+        status=Job.FAILED,
+        last_error='Обработчик не завершил задачу.',
+        locked_by='',
+        locked_at=None,
+        updated=now,
+    )
+    ready = (
+        Q(status=Job.PENDING, run_after__lte=now)
+        | Q(status=Job.RUNNING, locked_at__lt=stale)
+    )
+    ids = list(
+        Job.objects.filter(ready).order_by('run_after', 'pk').values_list(
+            'pk', flat=True
+        )[:limit]
+    )
+    if not ids:
+        return []
+    token = f'{worker}:{uuid.uuid4().hex[:8]}'
+    Job.objects.filter(ready, pk__in=ids).update(
+        status=Job.RUNNING,
+        attempts=F('attempts') + 1,
+        locked_by=token,
+        locked_at=now,
+        updated=now,
+    )
+    return list(
+        Job.objects.filter(locked_by=token, status=Job.RUNNING).order_by(
+            'run_after', 'pk'
+        )
+    )
+
+
+def retry_delay(attempts):
+    """Экспоненциальная пауза перед следующей попыткой."""
+    return settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def finish(job, **changes):
+    """Записывает итог задачи, если её не забрал другой обработчик."""
+    changes.update(locked_by='', locked_at=None)
+    updated = Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        updated=timezone.now(), **changes
+    )
+    if updated:
+        for field, value in changes.items():
+            setattr(job, field, value)
+    return bool(updated)
+
+
+def run_job(job):
+    """Выполняет забранную задачу и возвращает её новое состояние.
+
+    Отметка о выполнении пишется первой в транзакции задачи и фиксируется
+    вместе с её изменениями. В SQLite первая запись заодно берёт блокировку
+    базы: транзакция, начатая с чтения, падает при записи, если другой
+    поток успел изменить базу. При ошибке изменения откатываются, а задача
+    повторяется позже или помечается неудачной после max_attempts попыток.
+    """
+    locked_by = job.locked_by
+    try:
+        func = TASKS.get(job.name)
+        if func is None:
+            raise LookupError(f'Неизвестная задача: {job.name}')
+        with transaction.atomic():
+            if finish(job, status=Job.DONE, last_error=''):
+                func(**json.loads(job.payload))
+    except Exception:
+        logger.exception('Задача %s не выполнена', job)
+        job.locked_by = locked_by
+        job.status = Job.RUNNING
+        changes = {'last_error': traceback.format_exc()}
+        if job.attempts >= job.max_attempts:
+            changes['status'] = Job.FAILED
+        else:
+            changes['status'] = Job.PENDING
+            changes['run_after'] = timezone.now() + timedelta(
+                seconds=retry_delay(job.attempts)
+            )
+        finish(job, **changes)
+    return job.status
+
+
+def purge():
+    """Удаляет выполненные задачи старше JOBS_KEEP_DONE секунд.
+
+    Ключи идемпотентности живут, пока живёт задача: повтор с тем же
+    ключом после удаления снова поставит её в очередь.
+    """
+    border = timezone.now() - timedelta(seconds=settings.JOBS_KEEP_DONE)
+    deleted, _ = Job.objects.filter(
+        status=Job.DONE, updated__lt=border
+    ).delete()
+    return deleted
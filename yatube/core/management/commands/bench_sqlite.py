@@ -0,0 +1,122 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sqlite import apply_pragmas
+
+SCHEMA = (
+    'CREATE TABLE post ('
+    'id INTEGER PRIMARY KEY, text TEXT NOT NULL, pub_date REAL NOT NULL)'
+)
+WRITE = 'INSERT INTO post (text, pub_date) VALUES (?, ?)'
+READ = 'SELECT id, text, pub_date FROM post ORDER BY id DESC LIMIT 10'
+
+
+def connect(path, pragmas):
+    connection = sqlite3.connect(path)
+    apply_pragmas(connection.cursor(), pragmas)
+    return connection
+
+
+def worker(path, pragmas, deadline, write, result, lock):
+    """Пишет или читает по одной операции в транзакции до deadline."""
+    connection = connect(path, pragmas)
+    operations = errors = 0
+    try:
+        while time.perf_counter() < deadline:
+            try:
+                if write:
+                    with connection:
+                        connection.execute(WRITE, ('текст', time.time()))
+                else:
+                    connection.execute(READ).fetchall()
+                operations += 1
+            except sqlite3.OperationalError:
+                errors += 1
+    finally:
+        connection.close()
+    kind = 'writes' if write else 'reads'
+    with lock:
+        result[kind] += operations
+        result['errors'] += errors
+
+
+def run(pragmas, writers, readers, seconds, rows):
+    """Операций в секунду для одного набора PRAGMA на новой базе."""
+    handle, path = tempfile.mkstemp(suffix='.sqlite3')
+    os.close(handle)
+    try:
+        with connect(path, pragmas) as connection:
+            connection.execute(SCHEMA)
+            connection.executemany(
+                WRITE, (('текст', time.time()) for _ in range(rows))
+            )
+        result = {'writes': 0, 'reads': 0, 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + seconds
+        threads = [
+            threading.Thread(
+                target=worker,
+                args=(path, pragmas, deadline, write, result, lock),
+            )
+            for write in [True] * writers + [False] * readers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    return {
+        'writes_per_s': round(result['writes'] / seconds, 1),
+        'reads_per_s': round(result['reads'] / seconds, 1),
+        'errors': result['errors'],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite на запись и чтение при '
+        'параллельной нагрузке с настройками по умолчанию и с '
+        'SQLITE_PRAGMAS.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--output', help='Файл для результатов в JSON.')
+
+    def handle(self, *args, **options):
+        if not settings.SQLITE_PRAGMAS:
+            raise CommandError('SQLITE_PRAGMAS пуст: сравнивать не с чем.')
+        modes = {'default': {}, 'tuned': settings.SQLITE_PRAGMAS}
+        results = {}
+        for mode, pragmas in modes.items():
+            results[mode] = run(
+                pragmas,
+                options['writers'],
+                options['readers'],
+                options['seconds'],
+                options['rows'],
+            )
+            self.stdout.write(f'{mode}: {results[mode]}')
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(
+                    {'pragmas': settings.SQLITE_PRAGMAS, 'results': results},
+                    output,
+                    indent=2,
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f'Результаты сохранены в {options["output"]}'
+            ))
@@ -0,0 +1,85 @@
+import os
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core import jobs
+
+
+def run_in_pool(job):
+    try:
+        return jobs.run_job(job)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Обработчик очереди задач: забирает готовые задачи пачками '
+        'и выполняет их в пуле потоков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.JOBS_WORKERS,
+            help='Потоков в пуле; 1 — выполнять в основном потоке.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.JOBS_BATCH_SIZE,
+            help='Сколько задач забирать за один запрос.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Выйти, когда готовых задач не останется.',
+        )
+
+    def handle(self, *args, **options):
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        workers = options['workers']
+        pool = None
+        if workers > 1:
+            pool = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix='jobs'
+            )
+        results = {}
+        try:
+            while True:
+                batch = jobs.claim(worker, options['batch_size'])
+                if pool is None:
+                    statuses = map(jobs.run_job, batch)
+                else:
+                    statuses = pool.map(run_in_pool, batch)
+                for status in statuses:
+                    results[status] = results.get(status, 0) + 1
+                if batch:
+                    continue
+                jobs.purge()
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        summary = ', '.join(
+            f'{status}: {count}' for status, count in sorted(results.items())
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано задач: {sum(results.values())} ({summary or "нет"})'
+        ))
@@ -0,0 +1,231 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.template.base import Template
+
+BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+# Как часто процесс переписывает свой файл в METRICS_DIR и через сколько
+# секунд без обновлений файл остановленного процесса не учитывается.
+FLUSH_INTERVAL = 5
+STALE_AFTER = 24 * 60 * 60
+
+_local = threading.local()
+_lock = threading.Lock()
+_histograms = defaultdict(dict)
+_flushed = 0.0
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def as_dict(self):
+        labels = [f'le_{bucket}' for bucket in self.buckets] + ['le_inf']
+        return {
+            'count': self.count,
+            'sum': round(self.total, 3),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class RequestMetrics:
+    """Метрики одного запроса: SQL, шаблоны и кэш."""
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def sql_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_time += time.perf_counter() - started
+
+    def server_timing(self, total):
+        return ', '.join((
+            f'sql;dur={self.sql_time * 1000:.1f};'
+            f'desc="{self.sql_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="hit={self.cache_hits} miss={self.cache_misses}"',
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+
+def current():
+    return getattr(_local, 'metrics', None)
+
+
+def start():
+    _local.metrics = RequestMetrics()
+    return _local.metrics
+
+
+def stop():
+    _local.metrics = None
+
+
+def record_cache(hit):
+    """Отмечает попадание или промах кэша в текущем запросе."""
+    metrics = current()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+def observe(view, name, value):
+    with _lock:
+        histogram = _histograms[view].get(name)
+        if histogram is None:
+            histogram = _histograms[view][name] = Histogram()
+        histogram.observe(value)
+
+
+def record_request(view, metrics, total, size):
+    observe(view, 'total_ms', total * 1000)
+    observe(view, 'sql_ms', metrics.sql_time * 1000)
+    observe(view, 'sql_queries', metrics.sql_count)
+    observe(view, 'template_ms', metrics.template_time * 1000)
+    observe(view, 'cache_hits', metrics.cache_hits)
+    observe(view, 'cache_misses', metrics.cache_misses)
+    if size is not None:
+        observe(view, 'response_kb', size / 1024)
+    flush()
+
+
+def snapshot():
+    """Гистограммы этого процесса."""
+    with _lock:
+        return {
+            view: {
+                name: histogram.as_dict()
+                for name, histogram in histograms.items()
+            }
+            for view, histograms in _histograms.items()
+        }
+
+
+def worker_path():
+    return os.path.join(settings.METRICS_DIR, f'{os.getpid()}.json')
+
+
+def flush(force=False):
+    """Записывает гистограммы процесса в его файл в METRICS_DIR.
+
+    Не чаще раза в FLUSH_INTERVAL секунд, если не force.
+    """
+    global _flushed
+    if not settings.METRICS_DIR:
+        return
+    now = time.monotonic()
+    if not force and now - _flushed < FLUSH_INTERVAL:
+        return
+    _flushed = now
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    path = worker_path()
+    temporary = f'{path}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w') as target:
+        json.dump(snapshot(), target)
+    os.replace(temporary, path)
+
+
+def merge(total, histogram):
+    if total is None:
+        return {**histogram, 'buckets': dict(histogram['buckets'])}
+    total['count'] += histogram['count']
+    total['sum'] = round(total['sum'] + histogram['sum'], 3)
+    for label, count in histogram['buckets'].items():
+        total['buckets'][label] = total['buckets'].get(label, 0) + count
+    return total
+
+
+def worker_snapshots():
+    """Гистограммы процессов, обновлявших файлы за STALE_AFTER секунд."""
+    flush(force=True)
+    stale = time.time() - STALE_AFTER
+    for entry in os.scandir(settings.METRICS_DIR):
+        if not entry.name.endswith('.json'):
+            continue
+        try:
+            if entry.stat().st_mtime < stale:
+                continue
+            with open(entry.path) as source:
+                yield json.load(source)
+        except (OSError, ValueError):
+            continue
+
+
+def collect():
+    """Гистограммы всех процессов и их число.
+
+    Без METRICS_DIR процессы не видят друг друга, и возвращаются
+    гистограммы только этого процесса.
+    """
+    if not settings.METRICS_DIR:
+        return snapshot(), 1
+    merged = defaultdict(dict)
+    processes = 0
+    for data in worker_snapshots():
+        processes += 1
+        for view, histograms in data.items():
+            for name, histogram in histograms.items():
+                merged[view][name] = merge(
+                    merged[view].get(name), histogram
+                )
+    return dict(merged), processes
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+    if settings.METRICS_DIR and os.path.exists(worker_path()):
+        os.remove(worker_path())
+
+
+def instrument_templates():
+    """Считает время отрисовки шаблонов в запросах с метриками.
+
+    Вложенные шаблоны ({% include %}) учитываются внутри внешнего.
+    """
+    original = Template.render
+    if getattr(original, 'instrumented', False):
+        return
+
+    def render(self, context):
+        metrics = current()
+        if metrics is None:
+            return original(self, context)
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return original(self, context)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - started
+
+    render.instrumented = True
+    Template.render = render
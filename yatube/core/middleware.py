@@ -0,0 +1,79 @@
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import db, metrics
+
+
+class MetricsMiddleware:
+    """Собирает метрики для доли запросов METRICS_SAMPLE_RATE.
+
+    Итог отдаётся в заголовке Server-Timing и копится в гистограммах
+    по имени представления.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+        request_metrics = metrics.start()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(
+                        request_metrics.sql_wrapper
+                    ))
+                response = self.get_response(request)
+        finally:
+            metrics.stop()
+        total = time.perf_counter() - started
+        response['Server-Timing'] = request_metrics.server_timing(total)
+        match = request.resolver_match
+        size = None if response.streaming else len(response.content)
+        metrics.record_request(
+            match.view_name if match else 'unresolved',
+            request_metrics,
+            total,
+            size,
+        )
+        return response
+
+
+class ReplicaMiddleware:
+    """Выбирает базу для запроса и держит клиента на основной после записи.
+
+    Пока жива кука REPLICA_STICKY_COOKIE, все чтения клиента идут в
+    default: реплика может ещё не получить его изменения.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        db.reset()
+        try:
+            response = self.get_response(request)
+            if db.wrote():
+                response.set_cookie(
+                    settings.REPLICA_STICKY_COOKIE,
+                    '1',
+                    max_age=settings.REPLICA_STICKY_SECONDS,
+                    httponly=True,
+                )
+        finally:
+            db.reset()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            getattr(view_func, 'replica_reads', False)
+            and request.method in ('GET', 'HEAD')
+            and settings.REPLICA_STICKY_COOKIE not in request.COOKIES
+        ):
+            db.use_replica(db.choose_replica())
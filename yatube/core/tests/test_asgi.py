@@ -0,0 +1,100 @@
+import asyncio
+
+from django.core.handlers.wsgi import WSGIHandler, WSGIRequest
+from django.test import SimpleTestCase
+
+from core.asgi import ASGIHandler, build_environ
+
+
+class ASGIHandlerTests(SimpleTestCase):
+    def setUp(self):
+        self.application = ASGIHandler(WSGIHandler(), 2, 1)
+        self.addCleanup(self.application.read_pool.shutdown)
+        self.addCleanup(self.application.write_pool.shutdown)
+
+    def request(self, path, method='GET', body=b''):
+        scope = {
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'testserver')],
+        }
+        chunks = [
+            {'type': 'http.request', 'body': body[:3], 'more_body': True},
+            {'type': 'http.request', 'body': body[3:]},
+        ]
+        sent = []
+
+        async def receive():
+            return chunks.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.application(scope, receive, send))
+        start, *body_messages = sent
+        return start['status'], b''.join(m['body'] for m in body_messages)
+
+    def test_get_is_served_by_django(self):
+        status, body = self.request('/about/tech/')
+        self.assertEqual(status, 200)
+        self.assertIn('Технологии'.encode(), body)
+
+    def test_post_goes_to_write_pool(self):
+        """Запись без CSRF-токена отклоняется, как и через WSGI."""
+        status, _ = self.request('/auth/login/', 'POST', b'username=x')
+        self.assertEqual(status, 403)
+
+    def test_environ(self):
+        environ = build_environ({
+            'method': 'GET',
+            'path': '/группа/',
+            'query_string': b'a=1',
+            'headers': [
+                (b'content-type', b'text/plain'),
+                (b'accept', b'text/html'),
+                (b'accept', b'*/*'),
+            ],
+        }, None)
+        self.assertEqual(environ['PATH_INFO'], '/группа/'.encode().decode(
+            'latin-1'
+        ))
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_ACCEPT'], 'text/html,*/*')
+        self.assertEqual(environ['QUERY_STRING'], 'a=1')
+
+    def test_repeated_cookie_headers(self):
+        """Несколько заголовков Cookie склеиваются через '; '."""
+        environ = build_environ({
+            'method': 'GET',
+            'path': '/',
+            'headers': [
+                (b'cookie', b'sessionid=abc'),
+                (b'cookie', b'csrftoken=xyz'),
+            ],
+        }, None)
+        self.assertEqual(
+            environ['HTTP_COOKIE'], 'sessionid=abc; csrftoken=xyz'
+        )
+        request = WSGIRequest(environ)
+        self.assertEqual(request.COOKIES, {
+            'sessionid': 'abc', 'csrftoken': 'xyz',
+        })
+
+    def test_lifespan(self):
+        messages = [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}
+        ]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(self.application({'type': 'lifespan'}, receive, send))
+        self.assertEqual(
+            sent, ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        )
@@ -0,0 +1,76 @@
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import TwoTierCache
+
+SHARED_LOCATION = tempfile.mkdtemp()
+
+
+def worker_cache(**options):
+    """Отдельный экземпляр кэша, как в другом процессе gunicorn."""
+    return TwoTierCache('shared', {'OPTIONS': {'SHARED': 'shared', **options}})
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': SHARED_LOCATION,
+    },
+})
+class TwoTierCacheTests(SimpleTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(SHARED_LOCATION, ignore_errors=True)
+
+    def setUp(self):
+        caches['shared'].clear()
+
+    def test_workers_share_second_tier(self):
+        """Запись одного воркера видна другому через общий кэш."""
+        first, second = worker_cache(), worker_cache()
+        first.set('key', 'value')
+        self.assertEqual(second.get('key'), 'value')
+        self.assertEqual(second.get_many(['key', 'nope']), {'key': 'value'})
+
+    def test_first_tier_answers_without_shared(self):
+        """Повторное чтение обслуживается памятью процесса."""
+        worker = worker_cache(L1_TIMEOUT=60)
+        worker.set('key', 'value')
+        caches['shared'].delete('key')
+        self.assertEqual(worker.get('key'), 'value')
+
+    def test_first_tier_can_be_disabled(self):
+        """При L1_TIMEOUT = 0 чтение всегда идёт в общий кэш."""
+        worker = worker_cache(L1_TIMEOUT=0)
+        worker.set('key', 'value')
+        caches['shared'].delete('key')
+        self.assertIsNone(worker.get('key'))
+
+    def test_first_tier_evicts_least_recently_used(self):
+        """Первый уровень ограничен L1_MAX_ENTRIES записями."""
+        worker = worker_cache(L1_TIMEOUT=60, L1_MAX_ENTRIES=2)
+        worker.set('a', 1)
+        worker.set('b', 2)
+        worker.get('a')
+        worker.set('c', 3)
+        caches['shared'].clear()
+        self.assertEqual(worker.get_many(['a', 'b', 'c']), {'a': 1, 'c': 3})
+
+    def test_delete_and_incr_reach_both_tiers(self):
+        """Удаление и инкремент меняют оба уровня."""
+        first, second = worker_cache(), worker_cache(L1_TIMEOUT=0)
+        first.set('counter', 1)
+        self.assertEqual(first.incr('counter'), 2)
+        self.assertEqual(second.get('counter'), 2)
+        first.delete('counter')
+        self.assertIsNone(first.get('counter'))
+        self.assertIsNone(second.get('counter'))
+        self.assertTrue(first.add('lock', 1))
+        self.assertFalse(second.add('lock', 1))
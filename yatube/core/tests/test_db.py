@@ -0,0 +1,165 @@
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import reverse
+
+from core import db
+from core.middleware import ReplicaMiddleware
+from posts import syndication
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+@mock.patch('core.db.choose_replica', return_value='replica1')
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = db.ReplicaRouter()
+        self.routes = []
+
+    def call(self, view, request):
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = ReplicaMiddleware(get_response)
+        return middleware(request)
+
+    def read_view(self, request):
+        self.routes.append(self.router.db_for_read(Post))
+        return HttpResponse()
+
+    def test_marked_views_read_from_replica(self, choose_replica):
+        """Помеченное представление читает с реплики."""
+        response = self.call(replica_view(self.read_view),
+                             self.factory.get('/'))
+        self.assertEqual(self.routes, ['replica1'])
+        self.assertNotIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+
+    def test_other_views_and_posts_use_primary(self, choose_replica):
+        """Непомеченные представления и POST работают с default."""
+        self.call(self.read_view, self.factory.get('/'))
+        self.call(replica_view(self.read_view), self.factory.post('/'))
+        self.assertEqual(self.routes, [None, None])
+
+    def test_write_makes_client_sticky(self, choose_replica):
+        """После записи клиент читает свои изменения из default."""
+        def write_view(request):
+            self.router.db_for_write(Post)
+            return self.read_view(request)
+
+        response = self.call(replica_view(write_view), self.factory.get('/'))
+        self.assertIsNone(self.routes[0])
+        cookie = response.cookies[settings.REPLICA_STICKY_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_STICKY_SECONDS)
+        request = self.factory.get('/')
+        request.COOKIES[settings.REPLICA_STICKY_COOKIE] = '1'
+        self.call(replica_view(self.read_view), request)
+        self.assertIsNone(self.routes[1])
+
+    def test_state_is_reset_after_request(self, choose_replica):
+        self.call(replica_view(self.read_view), self.factory.get('/'))
+        self.assertIsNone(self.router.db_for_read(Post))
+
+    def test_sessions_and_cache_table_read_from_primary(self, choose_replica):
+        """Сессии и DatabaseCache не читаются с отстающей реплики."""
+        cache_model = DatabaseCache('cache_table', {}).cache_model_class
+
+        def session_view(request):
+            self.routes.append(self.router.db_for_read(Session))
+            self.routes.append(self.router.db_for_read(cache_model))
+            return HttpResponse()
+
+        self.call(replica_view(session_view), self.factory.get('/'))
+        self.assertEqual(self.routes, [None, None])
+
+    @override_settings(REPLICA_CACHE_TIMEOUT=30)
+    def test_replica_reads_are_cached_briefly(self, choose_replica):
+        """Построенное по чтениям с реплики живёт в кэше недолго."""
+        timeouts = []
+
+        def cache_view(request):
+            timeouts.append(db.cache_timeout(None))
+            timeouts.append(db.cache_timeout(10))
+            return HttpResponse()
+
+        self.call(replica_view(cache_view), self.factory.get('/'))
+        self.call(cache_view, self.factory.get('/'))
+        self.assertEqual(timeouts, [30, 10, None, 10])
+
+
+def replica_view(view):
+    def wrapper(request):
+        return view(request)
+    return db.replica_reads(wrapper)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_test'])
+class ReplicaDatabaseTests(TransactionTestCase):
+    """Реплика — отдельный файл SQLite с расходящимися данными."""
+
+    reset_sequences = True
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(author=self.user, text='Основная')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'replica.sqlite3')
+        replica = sqlite3.connect(path)
+        connections['default'].ensure_connection()
+        connections['default'].connection.backup(replica)
+        replica.execute(
+            'UPDATE posts_post SET text = ? WHERE id = ?',
+            ('С реплики', self.post.pk),
+        )
+        replica.commit()
+        replica.close()
+        connections.databases['replica_test'] = {
+            **connections['default'].settings_dict, 'NAME': path,
+        }
+        self.addCleanup(self.drop_replica)
+        self.client.force_login(self.user)
+
+    def drop_replica(self):
+        connections['replica_test'].close()
+        del connections['replica_test']
+        del connections.databases['replica_test']
+
+    def texts(self):
+        response = self.client.get(reverse('posts:api_index'))
+        return [post['text'] for post in response.json()['results']]
+
+    def test_reads_go_to_replica_until_write(self):
+        """Чтение идёт с реплики, после записи — с основной базы."""
+        self.assertEqual(self.texts(), ['С реплики'])
+        self.client.post(reverse('posts:post_create'), {'text': 'Новая'})
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, self.client.cookies)
+        self.assertEqual(self.texts(), ['Новая', 'Основная'])
+
+    @override_settings(REPLICA_CACHE_TIMEOUT=30)
+    def test_feed_from_replica_is_cached_briefly(self):
+        """Лента с реплики живёт в кэше не дольше REPLICA_CACHE_TIMEOUT."""
+        url = reverse('posts:feed_index', args=['rss'])
+        with mock.patch.object(
+            syndication.cache, 'set', wraps=syndication.cache.set
+        ) as cache_set:
+            response = self.client.get(url)
+            content = b''.join(response.streaming_content).decode()
+        self.assertIn('С реплики', content)
+        self.assertEqual(cache_set.call_args[0][2], 30)
@@ -0,0 +1,99 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job
+
+CALLS = []
+
+
+@jobs.task('tests.record')
+def record(value):
+    CALLS.append(value)
+
+
+@jobs.task('tests.fail')
+def fail():
+    raise RuntimeError('boom')
+
+
+@override_settings(JOBS_SYNC=False, JOBS_RETRY_DELAY=10, JOBS_MAX_ATTEMPTS=2)
+class JobQueueTest(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_key_deduplicates(self):
+        """Повтор с тем же ключом не ставит вторую задачу."""
+        first = jobs.enqueue('tests.record', {'value': 1}, key='once')
+        second = jobs.enqueue('tests.record', {'value': 2}, key='once')
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_unknown_task_rejected(self):
+        with self.assertRaises(LookupError):
+            jobs.enqueue('tests.missing')
+
+    def test_claim_is_exclusive(self):
+        jobs.enqueue('tests.record', {'value': 1})
+        jobs.enqueue('tests.record', {'value': 2}, delay=60)
+        claimed = jobs.claim('a', 10)
+        self.assertEqual(len(claimed), 1)
+        self.assertEqual(claimed[0].attempts, 1)
+        self.assertEqual(jobs.claim('b', 10), [])
+
+    def test_stale_job_reclaimed(self):
+        jobs.enqueue('tests.record', {'value': 1})
+        jobs.claim('a', 10)
+        Job.objects.update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(len(jobs.claim('b', 10)), 1)
+
+    def test_failure_retried_then_failed(self):
+        job = jobs.enqueue('tests.fail')
+        job, = jobs.claim('a', 10)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(jobs.run_job(job), Job.PENDING)
+        job.refresh_from_db()
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('RuntimeError', job.last_error)
+        Job.objects.update(run_after=timezone.now())
+        job, = jobs.claim('a', 10)
+        with self.assertLogs('core.jobs', 'ERROR'):
+            self.assertEqual(jobs.run_job(job), Job.FAILED)
+
+    def test_worker_runs_ready_jobs(self):
+        for value in range(3):
+            jobs.enqueue('tests.record', {'value': value})
+        out = StringIO()
+        call_command('run_jobs', once=True, workers=1, stdout=out)
+        self.assertEqual(sorted(CALLS), [0, 1, 2])
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 3)
+        self.assertIn('Обработано задач: 3', out.getvalue())
+
+    def test_purge_keeps_recent(self):
+        jobs.enqueue('tests.record', {'value': 1})
+        call_command('run_jobs', once=True, workers=1, stdout=StringIO())
+        self.assertEqual(jobs.purge(), 0)
+        Job.objects.update(updated=timezone.now() - timedelta(days=2))
+        self.assertEqual(jobs.purge(), 1)
+
+    def test_warns_when_nobody_runs_jobs(self):
+        """Задачи, которые давно никто не забрал, дают предупреждение."""
+        jobs._stall_checked = 0
+        with self.assertRaises(AssertionError):
+            with self.assertLogs('core.jobs', 'WARNING'):
+                jobs.enqueue('tests.record', {'value': 1})
+        Job.objects.update(run_after=timezone.now() - timedelta(minutes=5))
+        jobs._stall_checked = 0
+        with self.assertLogs('core.jobs', 'WARNING') as logs:
+            jobs.enqueue('tests.record', {'value': 2})
+        self.assertIn('run_jobs', logs.output[0])
+
+    @override_settings(JOBS_SYNC=True)
+    def test_sync_mode_runs_inline(self):
+        job = jobs.enqueue('tests.record', {'value': 7})
+        self.assertEqual(CALLS, [7])
+        self.assertEqual(job.status, Job.DONE)
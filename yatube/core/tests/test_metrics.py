@@ -0,0 +1,74 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+
+User = get_user_model()
+
+
+@override_settings(METRICS_SAMPLE_RATE=1)
+class MetricsMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.user = User.objects.create_user(username='user')
+
+    def setUp(self):
+        metrics.reset()
+        cache.clear()
+
+    def test_server_timing_header(self):
+        """Ответ содержит SQL, шаблоны и кэш в Server-Timing."""
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for part in ('sql;dur=', 'queries', 'tpl;dur=', 'cache;desc=',
+                     'total;dur='):
+            with self.subTest(part=part):
+                self.assertIn(part, timing)
+
+    def test_metrics_endpoint_for_staff_only(self):
+        """Гистограммы доступны только персоналу."""
+        self.client.get(reverse('posts:index'))
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('core:metrics'))
+        self.assertEqual(response.status_code, 302)
+        self.client.force_login(self.admin)
+        data = self.client.get(reverse('core:metrics')).json()
+        self.assertTrue(data['per_process'])
+        index = data['views']['posts:index']
+        self.assertEqual(index['total_ms']['count'], 1)
+        self.assertGreater(index['sql_queries']['sum'], 0)
+        self.assertGreater(index['template_ms']['sum'], 0)
+        self.assertEqual(index['cache_misses']['sum'], 1)
+
+    @override_settings(METRICS_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_measured(self):
+        """Запросы вне выборки не измеряются."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.assertEqual(metrics.snapshot(), {})
+
+    def test_workers_are_merged_through_metrics_dir(self):
+        """С METRICS_DIR /metrics/ складывает гистограммы всех процессов."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        other = metrics.Histogram()
+        other.observe(3)
+        with open(os.path.join(directory, '1.json'), 'w') as worker:
+            json.dump({'posts:index': {'total_ms': other.as_dict()}}, worker)
+        with self.settings(METRICS_DIR=directory):
+            self.client.get(reverse('posts:index'))
+            self.client.force_login(self.admin)
+            data = self.client.get(reverse('core:metrics')).json()
+            metrics.reset()
+        self.assertFalse(data['per_process'])
+        self.assertEqual(data['processes'], 2)
+        self.assertEqual(data['views']['posts:index']['total_ms']['count'], 2)
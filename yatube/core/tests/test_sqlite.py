@@ -0,0 +1,29 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+
+
+class SQLitePragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        """PRAGMA из настроек действуют в соединении Django."""
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('cache_size'), -20000)
+
+    def test_bench_compares_modes(self):
+        out = StringIO()
+        call_command('bench_sqlite', seconds=0.1, rows=10, stdout=out)
+        self.assertIn('default:', out.getvalue())
+        self.assertIn('tuned:', out.getvalue())
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_bench_requires_pragmas(self):
+        with self.assertRaises(CommandError):
+            call_command('bench_sqlite', seconds=0.1, stdout=StringIO())
@@ -1,5 +1,10 @@
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +20,14 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def metrics_view(request):
+    """Гистограммы по представлениям; per_process — без METRICS_DIR."""
+    views, processes = metrics.collect()
+    return JsonResponse({
+        'per_process': not settings.METRICS_DIR,
+        'processes': processes,
+        'views': views,
+    })
@@ -1,6 +1,11 @@
+from itertools import chain
+
 from django.contrib import admin
+from django.http import StreamingHttpResponse
 
 from .models import Comment, Follow, Group, Post
+from .paginators import EstimatedCountPaginator
+from .transfer import SPECS, csv_header, export_rows, format_row
 
 
 class CommentInline(admin.TabularInline):
@@ -22,13 +27,42 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ('export_csv',)
     inlines = [
         CommentInline,
     ]
 
+    def formfield_for_dbfield(self, db_field, request, **kwargs):
+        """Список групп читается один раз на запрос, а не для каждой строки
+        с list_editable."""
+        formfield = super().formfield_for_dbfield(db_field, request, **kwargs)
+        if db_field.name == 'group' and formfield is not None:
+            if not hasattr(request, 'group_choices'):
+                request.group_choices = list(formfield.choices)
+            formfield.choices = request.group_choices
+        return formfield
+
+    def export_csv(self, request, queryset):
+        columns = list(SPECS['post'][1])
+        lines = (
+            format_row(row, 'csv', columns)
+            for row in export_rows('post', queryset=queryset)
+        )
+        response = StreamingHttpResponse(
+            chain([csv_header(columns)], lines),
+            content_type='text/csv; charset=utf-8',
+        )
+        response['Content-Disposition'] = 'attachment; filename="posts.csv"'
+        return response
+
+    export_csv.short_description = 'Выгрузить в CSV'
+
 
 class FollowAdmin(admin.ModelAdmin):
     list_display = ('user', 'author',)
@@ -0,0 +1,114 @@
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+from core.db import replica_reads
+
+from . import timeline
+from .comments import comment_count
+from .conditional import make_etag, post_generations, scope_etag, viewer
+from .models import Group, Post, User
+from .page_cache import (
+    group_scope, index_scope, profile_scope, scope_generation
+)
+from .paginators import CursorPaginator
+
+API_PER_PAGE = 20
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'image', 'author__username', 'group__slug'
+)
+
+
+def compact(posts):
+    """Только поля, которые отдаёт API, без лишних колонок и JOIN."""
+    return posts.select_related('author', 'group').only(*POST_FIELDS)
+
+
+def serialize(post):
+    return {
+        'id': post.pk,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': post.author.username,
+        'group': post.group.slug if post.group_id else None,
+        'image': post.image.url if post.image else None,
+    }
+
+
+def feed_response(request, posts, paginator_class=CursorPaginator,
+                  **options):
+    paginator = paginator_class(compact(posts), API_PER_PAGE, **options)
+    page = paginator.get_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'results': [serialize(post) for post in page],
+        'next_cursor': paginator.next_cursor,
+        'previous_cursor': paginator.previous_cursor,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+def post_etag(request, post_id):
+    generations = post_generations(post_id)
+    if generations is None:
+        return None
+    return make_etag('api', *generations)
+
+
+def follow_etag(request):
+    """ETag ленты подписок по поколениям, без запросов к базе.
+
+    Поколение главной меняется при любой правке записей, авторов и групп
+    (в ответе есть их имена и slug), поколение лент — когда обработчик
+    меняет TimelineEntry, а поколение подписок зрителя — при подписке
+    и отписке. Курсор входит в ETag вместе с адресом.
+    """
+    if not request.user.is_authenticated:
+        return None
+    page_scope = index_scope()
+    return make_etag(
+        'api', viewer(request), request.get_full_path(),
+        scope_generation(page_scope), timeline.generation(),
+    )
+
+
+@replica_reads
+@condition(etag_func=scope_etag(index_scope))
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@replica_reads
+@condition(etag_func=scope_etag(group_scope))
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(request, group.posts.all())
+
+
+@replica_reads
+@condition(etag_func=scope_etag(profile_scope))
+def profile_posts(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, author.posts.all())
+
+
+@replica_reads
+@condition(etag_func=post_etag)
+def post_detail(request, post_id):
+    post = get_object_or_404(compact(Post.objects.filter(pk=post_id)))
+    data = serialize(post)
+    data['comment_count'] = comment_count(post.pk)
+    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+
+
+@replica_reads
+@vary_on_cookie
+@condition(etag_func=follow_etag)
+def follow_posts(request):
+    if not request.user.is_authenticated:
+        return JsonResponse(
+            {'detail': 'Требуется авторизация.'}, status=401
+        )
+    return feed_response(
+        request, Post.objects.all(), timeline.TimelinePaginator,
+        user=request.user,
+    )
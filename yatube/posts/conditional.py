@@ -0,0 +1,91 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from . import follows, fragments
+from .models import Post
+from .page_cache import (
+    group_scope, index_scope, profile_scope, scope_generation
+)
+
+
+def make_etag(*parts):
+    return hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+
+
+def viewer(request):
+    return follows.viewer_key(request.user)
+
+
+def scope_etag(scope, per_viewer=False):
+    """ETag страницы по поколению области и параметрам запроса.
+
+    Поколение меняется при любой инвалидации кэша страниц области,
+    поэтому ETag проверяется без запросов к базе за записями.
+    """
+    def etag(request, *args, **kwargs):
+        page_scope = scope(*args, **kwargs)
+        return make_etag(
+            page_scope,
+            scope_generation(page_scope),
+            viewer(request) if per_viewer else '',
+            request.get_full_path(),
+        )
+    return etag
+
+
+index_etag = scope_etag(index_scope, per_viewer=True)
+group_etag = scope_etag(group_scope, per_viewer=True)
+profile_etag = scope_etag(profile_scope, per_viewer=True)
+
+
+def post_generations(post_id):
+    """Поколения записи, её автора и группы и число записей автора."""
+    row = Post.objects.filter(pk=post_id).values(
+        'author_id', 'group_id', 'author__stats__post_count'
+    ).first()
+    if row is None:
+        return None
+    keys = [
+        fragments.generation_key('post', post_id),
+        fragments.generation_key('author', row['author_id']),
+    ]
+    if row['group_id']:
+        keys.append(fragments.generation_key('group', row['group_id']))
+    return [row['author__stats__post_count'], *fragments.get_generations(keys)]
+
+
+def post_etag(request, post_id):
+    generations = post_generations(post_id)
+    if generations is None:
+        return None
+    return make_etag(
+        'post', *generations, viewer(request), request.get_full_path()
+    )
+
+
+def conditional_page(etag_func):
+    """Условный GET для HTML-страницы: 304 без отрисовки шаблона.
+
+    Last-Modified не отдаётся: время последней записи не меняется при
+    удалении, правке, комментариях и подписках, а ETag учитывает их все.
+
+    Страницы отличаются для вошедших пользователей, поэтому ответ зависит
+    от Cookie, а для них ещё и не сохраняется в общих кэшах.
+    """
+    def decorator(view):
+        conditional_view = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            patch_vary_headers(response, ('Cookie',))
+            if request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, public=True, max_age=0)
+            return response
+        return wrapper
+    return decorator
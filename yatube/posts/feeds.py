@@ -0,0 +1,40 @@
+from . import timeline
+from .models import Post
+
+
+def index_posts():
+    return Post.objects.select_related(
+        'author__stats', 'group'
+    ).prefetch_related('thumbnails')
+
+
+def group_posts(group):
+    return group.posts.select_related(
+        'author__stats'
+    ).prefetch_related('thumbnails')
+
+
+def profile_posts(author):
+    return author.posts.select_related('group').prefetch_related('thumbnails')
+
+
+def follow_posts(user):
+    return timeline.feed(user).select_related(
+        'author__stats', 'group'
+    ).prefetch_related('thumbnails')
+
+
+def post_detail(post_id):
+    return Post.objects.select_related(
+        'author__stats', 'group'
+    ).prefetch_related('thumbnails').filter(pk=post_id)
+
+
+def post_comments(post):
+    return post.comments.select_related('author')
+
+
+def posts_by_ids(ids):
+    """Записи в порядке ids, например результаты поиска."""
+    posts = index_posts().in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
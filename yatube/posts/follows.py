@@ -0,0 +1,193 @@
+from array import array
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+
+from core.cache import CacheProxy
+
+from . import fragments
+from .models import Follow
+
+FOLLOWEES = 'followees'
+FOLLOWERS = 'followers'
+# Колонка со связанными id и колонка владельца списка.
+COLUMNS = {
+    FOLLOWEES: ('author_id', 'user_id'),
+    FOLLOWERS: ('user_id', 'author_id'),
+}
+ADJACENCY_TIMEOUT = 60 * 60
+
+cache = CacheProxy('posts')
+_graph = None
+
+
+class AdjacencyCache:
+    """LRU списков подписок в процессе: отсортированные array('I').
+
+    Размер ограничен суммарным числом id (max_ids), а не числом списков:
+    список популярного автора весит как тысячи списков читателей. Каждый
+    список хранится вместе с поколением, под которым его загрузили.
+    """
+
+    def __init__(self, max_ids):
+        self.max_ids = max_ids
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, kind, user_id, generation):
+        with self._lock:
+            stored, ids = self._entries.get((kind, user_id), (None, None))
+            if stored != generation:
+                return None
+            self._entries.move_to_end((kind, user_id))
+            return ids
+
+    def put(self, kind, user_id, generation, ids):
+        with self._lock:
+            self._drop((kind, user_id))
+            self._entries[(kind, user_id)] = (generation, ids)
+            self.size += len(ids) + 1
+            while self.size > self.max_ids and len(self._entries) > 1:
+                self._drop(next(iter(self._entries)))
+
+    def change(self, kind, user_id, previous, generation, other_id, added):
+        """Вносит изменение в список, загруженный под поколением previous.
+
+        Иначе список устарел и будет загружен заново при чтении.
+        """
+        with self._lock:
+            stored, ids = self._entries.get((kind, user_id), (None, None))
+            if stored is None or stored != previous:
+                return
+            # Копия: старый массив может перебирать другой поток.
+            ids = array('I', ids)
+            position = bisect_left(ids, other_id)
+            present = position < len(ids) and ids[position] == other_id
+            if added and not present:
+                insort(ids, other_id)
+                self.size += 1
+            elif not added and present:
+                del ids[position]
+                self.size -= 1
+            self._entries[(kind, user_id)] = (generation, ids)
+
+    def discard(self, kind, user_id):
+        with self._lock:
+            self._drop((kind, user_id))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= len(entry[1]) + 1
+
+
+def graph():
+    global _graph
+    if _graph is None:
+        _graph = AdjacencyCache(settings.POSTS_FOLLOW_GRAPH_MAX_IDS)
+    return _graph
+
+
+def generation(kind, user_id):
+    value, = fragments.get_generations(
+        [fragments.generation_key(kind, user_id)]
+    )
+    return value
+
+
+def adjacency(kind, user_id):
+    """Отсортированные id подписок (FOLLOWEES) или подписчиков (FOLLOWERS).
+
+    Порядок поиска: память процесса, общий кэш, таблица Follow.
+    """
+    current = generation(kind, user_id)
+    ids = graph().get(kind, user_id, current)
+    if ids is not None:
+        return ids
+    key = f'{kind}:{user_id}:{current}'
+    data = cache.get(key)
+    ids = array('I')
+    if data is None:
+        column, owner = COLUMNS[kind]
+        # Список сохраняется под текущим поколением, поэтому читается
+        # с основной базы, а не с отстающей реплики.
+        follows = Follow.objects.using('default').filter(**{owner: user_id})
+        ids.extend(follows.order_by(column).values_list(column, flat=True))
+        cache.add(key, ids.tobytes(), ADJACENCY_TIMEOUT)
+    else:
+        ids.frombytes(data)
+    graph().put(kind, user_id, current, ids)
+    return ids
+
+
+def contains(ids, value):
+    position = bisect_left(ids, value)
+    return position < len(ids) and ids[position] == value
+
+
+def followees(user_id):
+    return adjacency(FOLLOWEES, user_id)
+
+
+def followers(user_id):
+    return adjacency(FOLLOWERS, user_id)
+
+
+def follower_count(user_id):
+    return len(followers(user_id))
+
+
+def is_mutual(user_id, other_id):
+    return (
+        contains(followees(user_id), other_id)
+        and contains(followees(other_id), user_id)
+    )
+
+
+def viewer_key(user):
+    """Часть ключей кэша и ETag, зависящая от зрителя и его подписок."""
+    if not user.is_authenticated:
+        return '0'
+    return f'{user.pk}.{generation(FOLLOWEES, user.pk)}'
+
+
+def followed_authors(user, author_ids):
+    """Те из author_ids, на кого подписан user: не больше одного запроса."""
+    if not user.is_authenticated:
+        return set()
+    ids = followees(user.pk)
+    return {author_id for author_id in author_ids if contains(ids, author_id)}
+
+
+def is_following(user, author):
+    return author.pk in followed_authors(user, [author.pk])
+
+
+def page_followed(user, posts):
+    """Авторы записей страницы, на которых подписан user."""
+    return followed_authors(user, {post.author_id for post in posts})
+
+
+def changed(user_id, author_id, added):
+    """Новые поколения обоих списков; списки этого процесса правятся.
+
+    Правка остаётся, только если поколение до и после смены видно в общем
+    кэше: если его одновременно сменил другой воркер, список перечитается.
+    """
+    for kind, owner, other in (
+        (FOLLOWEES, user_id, author_id),
+        (FOLLOWERS, author_id, user_id),
+    ):
+        previous = fragments.read_generation(kind, owner)
+        current = fragments.bump_generation(kind, owner)
+        graph().change(kind, owner, previous, current, other, added)
+        if fragments.read_generation(kind, owner) != current:
+            graph().discard(kind, owner)
@@ -0,0 +1,90 @@
+import secrets
+import time
+from collections import Counter
+
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core import db, metrics
+from core.cache import CacheProxy
+
+CARD_TEMPLATE = 'includes/post_card.html'
+CARD_TIMEOUT = 60 * 60 * 24
+
+cache = CacheProxy('posts')
+stats = Counter()
+
+
+def generation_key(kind, pk):
+    return f'generation:{kind}:{pk}'
+
+
+def new_generation():
+    """Уникальное поколение: время в наносекундах и случайный хвост.
+
+    Счётчик через incr атомарен не во всех общих кэшах: file и db читают
+    и пишут значение отдельно, и два одновременных увеличения дали бы одно
+    поколение. Уникальное значение не совпадает ни с одним прежним, поэтому
+    ни одна инвалидация не теряется, в том числе после вытеснения ключа.
+    """
+    return f'{time.time_ns():x}{secrets.token_hex(4)}'
+
+
+def bump_generation(kind, pk):
+    """Делает устаревшими все фрагменты, собранные из объекта.
+
+    Возвращает новое поколение.
+    """
+    generation = new_generation()
+    cache.set(generation_key(kind, pk), generation, None)
+    return generation
+
+
+def read_generation(kind, pk):
+    """Поколение прямо из общего кэша, без памяти процесса, или None."""
+    return cache.shared.get(generation_key(kind, pk))
+
+
+def get_generations(keys):
+    """Поколения объектов; отсутствующие заводятся заново.
+
+    Если поколение одновременно завёл другой воркер, берётся его значение.
+    """
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            generation = new_generation()
+            if not cache.add(key, generation, None):
+                generation = cache.get(key, generation)
+            generations[key] = generation
+    return [generations[key] for key in keys]
+
+
+def card_key(post):
+    keys = [
+        generation_key('post', post.pk),
+        generation_key('author', post.author_id),
+    ]
+    if post.group_id:
+        keys.append(generation_key('group', post.group_id))
+    generations = ':'.join(map(str, get_generations(keys)))
+    return f'post_card:{post.pk}:{generations}'
+
+
+def render_card(post):
+    """HTML карточки записи из кэша или свежеотрисованный."""
+    key = card_key(post)
+    html = cache.get(key)
+    metrics.record_cache(html is not None)
+    if html is None:
+        stats['misses'] += 1
+        html = render_to_string(CARD_TEMPLATE, {'post': post})
+        cache.set(key, html, db.cache_timeout(CARD_TIMEOUT))
+    else:
+        stats['hits'] += 1
+    return mark_safe(html)
+
+
+def hit_rate():
+    total = stats['hits'] + stats['misses']
+    return stats['hits'] / total if total else 0.0
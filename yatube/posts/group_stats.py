@@ -0,0 +1,99 @@
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Subquery
+
+from .models import GroupAuthorStats, GroupStats, Post
+from .transfer import chunks
+
+TOP_AUTHORS = 5
+
+
+def add_post(group_id, author_id, pub_date):
+    """Учитывает запись в статистике группы в транзакции изменения."""
+    with transaction.atomic():
+        stats, _ = GroupStats.objects.get_or_create(group_id=group_id)
+        row, new_author = GroupAuthorStats.objects.get_or_create(
+            group_id=group_id, author_id=author_id
+        )
+        GroupAuthorStats.objects.filter(pk=row.pk).update(
+            post_count=F('post_count') + 1
+        )
+        changes = {'post_count': F('post_count') + 1}
+        if new_author:
+            changes['author_count'] = F('author_count') + 1
+        GroupStats.objects.filter(pk=stats.pk).update(**changes)
+        GroupStats.objects.filter(
+            Q(last_post__isnull=True) | Q(last_post__lt=pub_date),
+            pk=stats.pk,
+        ).update(last_post=pub_date)
+
+
+def remove_post(group_id, author_id, pub_date):
+    """Убирает запись из статистики группы.
+
+    Время последней записи перечитывается по индексу группы, только
+    если убрана самая свежая запись.
+    """
+    with transaction.atomic():
+        rows = GroupAuthorStats.objects.filter(
+            group_id=group_id, author_id=author_id
+        )
+        rows.filter(post_count__gte=1).update(post_count=F('post_count') - 1)
+        gone, _ = rows.filter(post_count=0).delete()
+        changes = {'post_count': F('post_count') - 1}
+        if gone:
+            changes['author_count'] = F('author_count') - 1
+        stats = GroupStats.objects.filter(group_id=group_id)
+        stats.filter(post_count__gte=1).update(**changes)
+        if stats.filter(last_post__lte=pub_date).exists():
+            stats.update(last_post=Subquery(
+                Post.objects.filter(group_id=group_id).order_by(
+                    '-pub_date'
+                ).values('pub_date')[:1]
+            ))
+
+
+def top_authors(group, limit=TOP_AUTHORS):
+    return GroupAuthorStats.objects.filter(group=group).select_related(
+        'author'
+    ).order_by('-post_count', 'author_id')[:limit]
+
+
+def rebuild(batch_size=1000):
+    """Пересчитывает статистику всех групп двумя агрегатами по Post.
+
+    batch_size ограничивает число строк в памяти. В bulk_create он не
+    передаётся: Django 2.2 не уменьшает его под ограничения SQLite,
+    а свою пачку подбирает сам.
+    """
+    posts = Post.objects.filter(group__isnull=False).order_by()
+    per_group = posts.values('group').annotate(
+        total=Count('pk'),
+        authors=Count('author', distinct=True),
+        last=Max('pub_date'),
+    )
+    per_author = posts.values('group', 'author').annotate(total=Count('pk'))
+    group_rows = (
+        GroupStats(
+            group_id=row['group'],
+            post_count=row['total'],
+            author_count=row['authors'],
+            last_post=row['last'],
+        )
+        for row in per_group.iterator()
+    )
+    author_rows = (
+        GroupAuthorStats(
+            group_id=row['group'],
+            author_id=row['author'],
+            post_count=row['total'],
+        )
+        for row in per_author.iterator()
+    )
+    with transaction.atomic():
+        GroupAuthorStats.objects.all().delete()
+        GroupStats.objects.all().delete()
+        for batch in chunks(group_rows, batch_size):
+            GroupStats.objects.bulk_create(batch)
+        for batch in chunks(author_rows, batch_size):
+            GroupAuthorStats.objects.bulk_create(batch)
+    return GroupStats.objects.count()
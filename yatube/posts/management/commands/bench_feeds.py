@@ -0,0 +1,194 @@
+import json
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import NEXT, encode_cursor
+from posts.seed import seed
+
+
+def percentile(values, percent):
+    """Значение по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(0, round(percent / 100 * len(ordered)) - 1)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summary(timings, queries):
+    timings_ms = [timing * 1000 for timing in timings]
+    return {
+        'p50_ms': round(percentile(timings_ms, 50), 3),
+        'p95_ms': round(percentile(timings_ms, 95), 3),
+        'p99_ms': round(percentile(timings_ms, 99), 3),
+        'mean_ms': round(statistics.mean(timings_ms), 3),
+        'queries': max(queries),
+    }
+
+
+def clear_caches():
+    caches['posts'].clear()
+    caches['default'].clear()
+
+
+def measure(client, url, requests, cold):
+    """Время и число запросов к базе для серии обращений к url."""
+    timings, queries = [], []
+    for _ in range(requests):
+        if cold:
+            clear_caches()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append(time.perf_counter() - started)
+        assert response.status_code == 200, (url, response.status_code)
+        queries.append(len(captured))
+    return summary(timings, queries)
+
+
+def allocations(client, url):
+    """Пиковый объём памяти, выделенной при отрисовке url без кэша."""
+    clear_caches()
+    tracemalloc.start()
+    try:
+        client.get(url)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def bench_urls(user, post):
+    middle = Post.objects.order_by('-pub_date', '-pk')[
+        Post.objects.count() // 2
+    ]
+    return {
+        'index': reverse('posts:index'),
+        'index_deep': reverse('posts:index') + '?cursor='
+        + encode_cursor(NEXT, middle),
+        'group_post': reverse(
+            'posts:group_list', kwargs={'slug': post.group.slug}
+        ),
+        'profile': reverse(
+            'posts:profile', kwargs={'username': post.author.username}
+        ),
+        'post_detail': reverse(
+            'posts:post_detail', kwargs={'post_id': post.pk}
+        ),
+        'follow_index': reverse('posts:follow_index'),
+    }
+
+
+def compare(previous, current):
+    """Строки с изменением p50 и p95 относительно прошлого прогона."""
+    for view, result in current['results'].items():
+        before = previous.get('results', {}).get(view)
+        if before is None:
+            continue
+        changes = []
+        for metric in ('p50_ms', 'p95_ms'):
+            old, new = before['cold'][metric], result['cold'][metric]
+            delta = (new - old) / old * 100 if old else 0
+            changes.append(f'{metric} {old} -> {new} ({delta:+.1f}%)')
+        yield f'{view}: ' + ', '.join(changes)
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу и измеряет задержки p50/p95/p99, число SQL-запросов '
+        'и выделение памяти для лент; результат сохраняется в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--follows', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Сколько раз запрашивать каждую страницу.',
+        )
+        parser.add_argument(
+            '--no-seed',
+            action='store_true',
+            help='Измерять на уже заполненной базе.',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Не откатывать созданные данные.',
+        )
+        parser.add_argument('--output', help='Файл для результатов в JSON.')
+        parser.add_argument(
+            '--compare',
+            help='JSON прошлого прогона для сравнения.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if not options['no_seed']:
+                self.stdout.write('Заполнение базы...')
+                seed(
+                    users=options['users'],
+                    posts=options['posts'],
+                    follows=options['follows'],
+                    comments=options['comments'],
+                    batch_size=options['batch_size'],
+                    random_seed=0,
+                )
+            result = self.run_bench(options['requests'])
+            transaction.set_rollback(
+                not options['keep'] and not options['no_seed']
+            )
+        for view, stats in result['results'].items():
+            self.stdout.write(
+                f'{view}: cold {stats["cold"]}, warm {stats["warm"]}, '
+                f'{stats["allocated_kb"]} KiB'
+            )
+        if options['compare']:
+            with open(options['compare']) as previous_file:
+                for line in compare(json.load(previous_file), result):
+                    self.stdout.write(line)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(result, output, ensure_ascii=False, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Результаты сохранены в {options["output"]}'
+            ))
+
+    def run_bench(self, requests):
+        user = User.objects.filter(follower__isnull=False).first()
+        post = Post.objects.select_related('author', 'group').filter(
+            group__isnull=False
+        ).order_by('-pk').first()
+        client = Client()
+        client.force_login(user)
+        results = {}
+        for view, url in bench_urls(user, post).items():
+            results[view] = {
+                'url': url,
+                'cold': measure(client, url, requests, cold=True),
+                'warm': measure(client, url, requests, cold=False),
+                'allocated_kb': allocations(client, url),
+            }
+        return {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'dataset': {
+                model.__name__: model.objects.count()
+                for model in (User, Group, Post, Follow, Comment)
+            },
+            'requests': requests,
+            'results': results,
+        }
@@ -0,0 +1,188 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+
+from core.asgi import ASGIHandler, build_environ
+from posts.models import Group, Post, User
+from posts.seed import seed
+
+from .bench_feeds import bench_urls, percentile
+
+READ_VIEWS = ('index', 'group_post', 'profile', 'post_detail')
+
+
+def scope_for(url):
+    parts = urlsplit(url)
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': parts.path,
+        'query_string': parts.query.encode(),
+        'headers': [(b'host', b'testserver')],
+        'http_version': '1.1',
+        'scheme': 'http',
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+
+def summary(timings, elapsed, errors):
+    timings_ms = [timing * 1000 for timing in timings]
+    return {
+        'requests_per_s': round(len(timings) / elapsed, 1),
+        'p50_ms': round(percentile(timings_ms, 50), 3),
+        'p95_ms': round(percentile(timings_ms, 95), 3),
+        'mean_ms': round(statistics.mean(timings_ms), 3),
+        'errors': errors,
+    }
+
+
+def run_wsgi(urls, workers, concurrency):
+    """concurrency клиентов на сервере с workers синхронными обработчиками."""
+    application = WSGIHandler()
+    slots = threading.BoundedSemaphore(workers)
+    errors = []
+
+    def request(url):
+        started = time.perf_counter()
+        with slots:
+            statuses = []
+            response = application(
+                build_environ(scope_for(url), BytesIO()),
+                lambda status, headers, exc_info=None: statuses.append(status),
+            )
+            try:
+                for _ in response:
+                    pass
+            finally:
+                response.close()
+        if not statuses[0].startswith('200'):
+            errors.append(url)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        timings = list(clients.map(request, urls))
+    return summary(timings, time.perf_counter() - started, len(errors))
+
+
+def run_asgi(urls, threads, concurrency):
+    """concurrency клиентов на ASGI-приложении с пулом из threads потоков."""
+    application = ASGIHandler(WSGIHandler(), read_threads=threads)
+    errors = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def request(url, clients):
+        async def send(message):
+            start = message['type'] == 'http.response.start'
+            if start and message['status'] != 200:
+                errors.append(url)
+
+        async with clients:
+            started = time.perf_counter()
+            await application(scope_for(url), receive, send)
+            return time.perf_counter() - started
+
+    async def run():
+        clients = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(request(url, clients) for url in urls))
+
+    started = time.perf_counter()
+    timings = asyncio.run(run())
+    elapsed = time.perf_counter() - started
+    application.read_pool.shutdown()
+    application.write_pool.shutdown()
+    return summary(timings, elapsed, len(errors))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность лент при параллельных запросах '
+        'через WSGI с фиксированным числом обработчиков и через ASGI с '
+        'пулом потоков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=32,
+            help='Сколько клиентов шлют запросы одновременно.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Синхронных обработчиков WSGI и потоков ASGI.',
+        )
+        parser.add_argument(
+            '--no-seed',
+            action='store_true',
+            help='Измерять на уже заполненной базе.',
+        )
+        parser.add_argument('--output', help='Файл для результатов в JSON.')
+
+    def handle(self, *args, **options):
+        # Запросы выполняются в других потоках со своими соединениями,
+        # поэтому тестовые данные фиксируются и удаляются после замеров.
+        data = None
+        if not options['no_seed']:
+            self.stdout.write('Заполнение базы...')
+            data = seed(
+                users=options['users'],
+                posts=options['posts'],
+                follows=options['users'] * 5,
+                comments=options['posts'],
+                random_seed=0,
+            )
+        try:
+            result = self.run_bench(options)
+        finally:
+            if data is not None:
+                User.objects.filter(
+                    pk__in=[user.pk for user in data['users']]
+                ).delete()
+                Group.objects.filter(
+                    pk__in=[group.pk for group in data['groups']]
+                ).delete()
+        for mode, stats in result['results'].items():
+            self.stdout.write(f'{mode}: {stats}')
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(result, output, indent=2)
+            self.stdout.write(self.style.SUCCESS(
+                f'Результаты сохранены в {options["output"]}'
+            ))
+
+    def run_bench(self, options):
+        post = Post.objects.select_related('author', 'group').filter(
+            group__isnull=False
+        ).order_by('-pk').first()
+        urls = [
+            url for view, url in bench_urls(post.author, post).items()
+            if view in READ_VIEWS
+        ]
+        urls = [urls[i % len(urls)] for i in range(options['requests'])]
+        workers, concurrency = options['workers'], options['concurrency']
+        return {
+            'requests': len(urls),
+            'workers': workers,
+            'concurrency': concurrency,
+            'results': {
+                'wsgi': run_wsgi(urls, workers, concurrency),
+                'asgi': run_asgi(urls, workers, concurrency),
+            },
+        }
@@ -0,0 +1,137 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from posts import feeds
+from posts.models import Follow, Group, Post, User
+from posts.paginators import NEXT, PREVIOUS, CursorPaginator, encode_cursor
+from posts.seed import seed
+from posts.timeline import TimelinePaginator
+from posts.views import PAGE_PER_PAGE
+
+DEEP_PAGES = ('следующая страница', 'предыдущая страница')
+
+
+def query_plan(queryset):
+    """Строки EXPLAIN QUERY PLAN для запроса."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan):
+    return [
+        line for line in plan
+        if line.startswith('SCAN')
+        and 'USING' not in line
+        and 'CONSTANT ROW' not in line
+    ]
+
+
+def depth_scans(plan):
+    """Записи читаются по индексу с начала ленты, а не с позиции курсора."""
+    return [line for line in plan if line.startswith('SCAN posts_post')]
+
+
+def page_cursors(middle):
+    """Первая страница и переходы вперёд и назад из середины ленты."""
+    return {
+        'первая страница': None,
+        DEEP_PAGES[0]: encode_cursor(NEXT, middle),
+        DEEP_PAGES[1]: encode_cursor(PREVIOUS, middle),
+    }
+
+
+def page_queries(name, queryset, middle):
+    paginator = CursorPaginator(queryset, PAGE_PER_PAGE)
+    return {
+        f'{name}: {page}': paginator.page_queryset(cursor)[1]
+        for page, cursor in page_cursors(middle).items()
+    }
+
+
+def timeline_queries(user, middle):
+    """Ключи страниц ленты подписок: TimelineEntry и популярные авторы."""
+    paginator = TimelinePaginator(feeds.index_posts(), PAGE_PER_PAGE, user)
+    queries = {}
+    for page, cursor in page_cursors(middle).items():
+        for number, queryset in enumerate(paginator.key_querysets(cursor)):
+            queries[f'подписки {number}: {page}'] = queryset
+    return queries
+
+
+def feed_queries(user, author, group, post):
+    """Все запросы, которые выполняют представления posts."""
+    queries = {
+        'группа по slug': Group.objects.filter(slug=group.slug),
+        'автор по username': User.objects.filter(username=author.username),
+        'запись по id': Post.objects.filter(pk=post.pk),
+        'комментарии записи': feeds.post_comments(post),
+        'подписчики автора': author.following.all(),
+        'подписка на автора': Follow.objects.filter(user=user, author=author),
+        'подписки пользователя': user.follower.all(),
+    }
+    feeds_by_name = {
+        'главная': feeds.index_posts(),
+        'группа': feeds.group_posts(group),
+        'профиль': feeds.profile_posts(author),
+    }
+    for name, queryset in feeds_by_name.items():
+        queries.update(page_queries(name, queryset, post))
+    queries.update(timeline_queries(user, post))
+    return queries
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу тестовыми данными и проверяет EXPLAIN QUERY PLAN '
+        'запросов лент: ни один не должен читать таблицу целиком, а '
+        'страницы по курсору должны начинаться с поиска по индексу.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Не откатывать созданные тестовые данные.',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда поддерживает только SQLite.')
+        with transaction.atomic():
+            data = seed(
+                users=options['users'],
+                posts=options['posts'],
+                follows=options['users'] * 5,
+                comments=options['posts'],
+                random_seed=0,
+            )
+            user = User.objects.filter(
+                pk__in=[seeded.pk for seeded in data['users']],
+                follower__isnull=False,
+            ).first()
+            post_ids = data['post_ids']
+            post = Post.objects.select_related('author', 'group').filter(
+                pk__gte=post_ids[len(post_ids) // 2], group__isnull=False
+            ).order_by('pk').first()
+            failures = []
+            queries = feed_queries(user, post.author, post.group, post)
+            for name, queryset in queries.items():
+                plan = query_plan(queryset)
+                self.stdout.write(name)
+                for line in plan:
+                    self.stdout.write(f'    {line}')
+                deep = name.endswith(DEEP_PAGES)
+                if full_scans(plan) or deep and depth_scans(plan):
+                    failures.append(name)
+            transaction.set_rollback(not options['keep'])
+        if failures:
+            raise CommandError(
+                'Полный просмотр таблицы: ' + ', '.join(failures)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено запросов: {len(queries)}, все используют индексы.'
+        ))
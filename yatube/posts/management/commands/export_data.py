@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.transfer import (
+    FORMATS, SPECS, csv_header, export_rows, format_row, guess_format,
+    read_checkpoint, write_checkpoint
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, записи, комментарии или подписки в JSON Lines '
+        'или CSV, читая таблицу пачками.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=SPECS)
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='По умолчанию определяется по расширению файла.',
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл с последним выгруженным id для продолжения выгрузки.',
+        )
+
+    def handle(self, *args, **options):
+        name, path = options['model'], options['path']
+        file_format = options['format'] or guess_format(path)
+        columns = list(SPECS[name][1])
+        checkpoint = options['checkpoint']
+        after = read_checkpoint(checkpoint, name)
+        chunk_size = options['chunk_size']
+        started = time.perf_counter()
+        exported = 0
+        with open(path, 'a' if after else 'w', newline='',
+                  encoding='utf-8') as output:
+            if file_format == 'csv' and not after:
+                output.write(csv_header(columns))
+            for row in export_rows(name, after, chunk_size):
+                output.write(format_row(row, file_format, columns))
+                exported += 1
+                if checkpoint and exported % chunk_size == 0:
+                    output.flush()
+                    write_checkpoint(checkpoint, name, row['id'])
+            if checkpoint and exported:
+                output.flush()
+                write_checkpoint(checkpoint, name, row['id'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Выгружено строк: {exported} за {elapsed:.1f} с '
+            f'({exported / elapsed if elapsed else 0:.0f} строк/с)'
+        ))
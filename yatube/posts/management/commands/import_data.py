@@ -0,0 +1,92 @@
+import time
+from collections import Counter
+from io import StringIO
+from itertools import islice
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.transfer import (
+    FORMATS, SPECS, chunks, guess_format, import_batch, read_checkpoint,
+    read_rows, reset_sequences, write_checkpoint
+)
+
+# Что пересчитывать после загрузки каждой модели. Группы сами по себе
+# не меняют ни счётчиков, ни лент, ни индекса.
+REBUILD_COMMANDS = {
+    'group': (),
+    'post': (
+        'rebuild_author_stats', 'rebuild_group_stats', 'rebuild_timelines',
+        'rebuild_search_index',
+    ),
+    'comment': ('rebuild_author_stats',),
+    'follow': ('rebuild_author_stats', 'rebuild_timelines'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, записи, комментарии или подписки из JSON Lines '
+        'или CSV пачками через bulk_create. Пользователи и группы ищутся '
+        'по username и slug, записи и комментарии получают новые id. '
+        'Уже загруженные строки и строки со ссылками на отсутствующие '
+        'объекты пропускаются, поэтому загрузку можно повторить.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=SPECS)
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='По умолчанию определяется по расширению файла.',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Файл с числом загруженных строк для продолжения загрузки.',
+        )
+        parser.add_argument(
+            '--no-rebuild',
+            action='store_true',
+            help='Не пересчитывать счётчики, ленты и поисковый индекс.',
+        )
+
+    def handle(self, *args, **options):
+        name, path = options['model'], options['path']
+        model = SPECS[name][0]
+        file_format = options['format'] or guess_format(path)
+        checkpoint = options['checkpoint']
+        position = read_checkpoint(checkpoint, name)
+        started = time.perf_counter()
+        processed, skipped = 0, Counter()
+        with open(path, newline='', encoding='utf-8') as source:
+            rows = islice(read_rows(source, file_format), position, None)
+            for batch in chunks(rows, options['batch_size']):
+                with transaction.atomic():
+                    skipped.update(import_batch(name, batch))
+                position += len(batch)
+                processed += len(batch)
+                if checkpoint:
+                    write_checkpoint(checkpoint, name, position)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'{position} строк, {processed / elapsed:.0f} строк/с'
+                )
+        reset_sequences(model)
+        if processed and not options['no_rebuild']:
+            for command in REBUILD_COMMANDS[name]:
+                call_command(command, stdout=StringIO())
+        elapsed = time.perf_counter() - started
+        for column, count in sorted(skipped.items()):
+            if column == 'id':
+                self.stdout.write(f'Уже загружено раньше: {count}')
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f'Пропущено без связанного объекта {column}: {count}'
+                ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано строк: {processed}, '
+            f'{processed / elapsed if elapsed else 0:.0f} строк/с'
+        ))
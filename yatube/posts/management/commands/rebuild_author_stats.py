@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts.models import AuthorStats, Comment, Follow, Post, User
+from posts.transfer import chunks
+
+
+def count_by(model, field):
+    rows = model.objects.order_by().values(field).annotate(total=Count('pk'))
+    return {row[field]: row['total'] for row in rows}
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики записей, комментариев и подписчиков.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько записей AuthorStats держать в памяти за раз.',
+        )
+
+    def handle(self, *args, **options):
+        posts = count_by(Post, 'author')
+        comments = count_by(Comment, 'author')
+        followers = count_by(Follow, 'author')
+        stats = (
+            AuthorStats(
+                author_id=author_id,
+                post_count=posts.get(author_id, 0),
+                comment_count=comments.get(author_id, 0),
+                follower_count=followers.get(author_id, 0),
+            )
+            for author_id in User.objects.values_list('pk', flat=True)
+            .iterator()
+        )
+        with transaction.atomic():
+            AuthorStats.objects.all().delete()
+            # batch_size не передаётся в bulk_create: Django 2.2 не уменьшает
+            # его под ограничения SQLite, а свою пачку подбирает сам.
+            for batch in chunks(stats, options['batch_size']):
+                AuthorStats.objects.bulk_create(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано авторов: {AuthorStats.objects.count()}'
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from posts.group_stats import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает статистику групп: записи, авторы, последняя запись.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк статистики держать в памяти за раз.',
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересчитано групп: {total}'
+        ))
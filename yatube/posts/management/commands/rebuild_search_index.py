@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс записей.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько записей добавлять в индекс за один запрос.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        total = search.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано записей: {total} '
+            f'за {time.perf_counter() - started:.1f} с'
+        ))
@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post, PostThumbnail
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры для всех записей с картинками.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Размер пула; 0 — строить в текущем потоке.',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Перестроить и уже готовые миниатюры.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').only('pk', 'image')
+        variant_ids = []
+        for post in posts.iterator():
+            variant_ids += thumbnails.ensure_variants(post, options['force'])
+        if options['workers']:
+            with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+                list(pool.map(thumbnails.generate_in_pool, variant_ids))
+        else:
+            for variant_id in variant_ids:
+                thumbnails.generate(variant_id)
+        failed = PostThumbnail.objects.filter(
+            pk__in=variant_ids, status=PostThumbnail.FAILED
+        ).count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Построено миниатюр: {len(variant_ids) - failed}, '
+            f'ошибок: {failed}'
+        ))
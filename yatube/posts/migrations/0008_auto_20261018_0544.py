@@ -0,0 +1,51 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:44
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def count_by(model, field):
+    rows = model.objects.order_by().values(field).annotate(total=Count('pk'))
+    return {row[field]: row['total'] for row in rows}
+
+
+def fill_author_stats(apps, schema_editor):
+    """Счётчики для уже существующих авторов."""
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    posts = count_by(apps.get_model('posts', 'Post'), 'author')
+    comments = count_by(apps.get_model('posts', 'Comment'), 'author')
+    followers = count_by(apps.get_model('posts', 'Follow'), 'author')
+    AuthorStats.objects.bulk_create(
+        AuthorStats(
+            author_id=author_id,
+            post_count=posts.get(author_id, 0),
+            comment_count=comments.get(author_id, 0),
+            follower_count=followers.get(author_id, 0),
+        )
+        for author_id in User.objects.values_list('pk', flat=True)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0007_auto_20220713_2332'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Количество записей')),
+                ('comment_count', models.PositiveIntegerField(default=0, verbose_name='Количество комментариев')),
+                ('follower_count', models.PositiveIntegerField(default=0, verbose_name='Количество подписчиков')),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(fill_author_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_auto_20261018_0549'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostThumbnail',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('geometry', models.CharField(max_length=32)),
+                ('source', models.CharField(max_length=255, verbose_name='Исходная картинка')),
+                ('url', models.CharField(blank=True, max_length=255)),
+                ('width', models.PositiveIntegerField(blank=True, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('pending', 'Готовится'), ('ready', 'Готова'), ('failed', 'Ошибка')], default='pending', max_length=16)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='thumbnails', to='posts.Post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='postthumbnail',
+            constraint=models.UniqueConstraint(fields=('post', 'geometry'), name='unique_post_thumbnail'),
+        ),
+    ]
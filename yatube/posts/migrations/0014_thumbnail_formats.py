@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_groupstats'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='postthumbnail',
+            name='unique_post_thumbnail',
+        ),
+        migrations.AddField(
+            model_name='postthumbnail',
+            name='format',
+            field=models.CharField(choices=[('JPEG', 'JPEG'), ('WEBP', 'WebP')], default='JPEG', max_length=8),
+        ),
+        migrations.AddConstraint(
+            model_name='postthumbnail',
+            constraint=models.UniqueConstraint(fields=('post', 'geometry', 'format'), name='unique_post_thumbnail_format'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_timeline_post_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportedId',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=20)),
+                ('source_id', models.PositiveIntegerField()),
+                ('object_id', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='importedid',
+            constraint=models.UniqueConstraint(fields=('model', 'source_id'), name='unique_imported_id'),
+        ),
+    ]
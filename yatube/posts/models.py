@@ -52,6 +52,20 @@ class Post(models.Model):
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date',
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date',
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date',
+            ),
+        ]
 
 
 class Comment(models.Model):
@@ -73,6 +87,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', '-created'],
+                name='comment_post_created',
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -86,3 +106,190 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following',
     )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow',
+            ),
+        ]
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+    )
+    post_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество записей',
+    )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество комментариев',
+    )
+    follower_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество подписчиков',
+    )
+
+    def __str__(self) -> str:
+        return str(self.author)
+
+
+class GroupStats(models.Model):
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='stats',
+    )
+    post_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество записей',
+    )
+    author_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество авторов',
+    )
+    last_post = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Последняя запись',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-last_post'],
+                name='group_stats_last_post',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return str(self.group)
+
+
+class GroupAuthorStats(models.Model):
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.CASCADE,
+        related_name='author_stats',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='group_stats',
+    )
+    post_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['group', 'author'],
+                name='unique_group_author_stats',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['group', '-post_count'],
+                name='group_author_post_count',
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_post',
+            ),
+        ]
+
+
+class PostThumbnail(models.Model):
+    JPEG = 'JPEG'
+    WEBP = 'WEBP'
+    FORMATS = (
+        (JPEG, 'JPEG'),
+        (WEBP, 'WebP'),
+    )
+    PENDING = 'pending'
+    READY = 'ready'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Готовится'),
+        (READY, 'Готова'),
+        (FAILED, 'Ошибка'),
+    )
+
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='thumbnails',
+    )
+    geometry = models.CharField(max_length=32)
+    format = models.CharField(max_length=8, choices=FORMATS, default=JPEG)
+    source = models.CharField(
+        max_length=255,
+        verbose_name='Исходная картинка',
+    )
+    url = models.CharField(max_length=255, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    status = models.CharField(
+        max_length=16,
+        choices=STATUSES,
+        default=PENDING,
+    )
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'geometry', 'format'],
+                name='unique_post_thumbnail_format',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.post_id} {self.geometry} {self.format} {self.status}'
+
+
+class ImportedId(models.Model):
+    """id объекта, загруженного import_data, по его id в источнике."""
+    model = models.CharField(max_length=20)
+    source_id = models.PositiveIntegerField()
+    object_id = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['model', 'source_id'],
+                name='unique_imported_id',
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.model} {self.source_id} -> {self.object_id}'
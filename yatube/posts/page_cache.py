@@ -0,0 +1,123 @@
+import hashlib
+import time
+from functools import wraps
+from threading import Lock
+
+from django.http import HttpResponse
+
+from core import db, metrics
+from core.cache import CacheProxy
+
+from . import follows, fragments
+
+# Страницы прошлых поколений никто не читает, срок жизни их убирает.
+PAGE_TIMEOUT = 10 * 60
+LOCK_TIMEOUT = 10
+LOCK_WAIT = 0.05
+LOCK_RETRIES = 40
+LOCK_STRIPES = 64
+
+cache = CacheProxy('posts')
+_render_locks = [Lock() for _ in range(LOCK_STRIPES)]
+
+
+def index_scope():
+    return 'index'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def profile_scope(username):
+    return f'profile:{username}'
+
+
+def scope_generation(scope):
+    """Поколение области: меняется при каждой инвалидации её страниц."""
+    generation, = fragments.get_generations(
+        [fragments.generation_key('page', scope)]
+    )
+    return generation
+
+
+def page_key(scope, request):
+    """Ключ страницы: область, её поколение, зритель и адрес с параметрами.
+
+    Вместе со зрителем в ключ входит поколение его подписок: кнопки
+    подписки на странице у каждого зрителя свои.
+    """
+    generation = scope_generation(scope)
+    viewer = follows.viewer_key(request.user)
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'page:{scope}:{generation}:{viewer}:{path}'
+
+
+def invalidate(*scopes):
+    """Сбрасывает страницы областей сменой поколения в их ключах."""
+    for scope in set(scopes):
+        fragments.bump_generation('page', scope)
+
+
+def from_cache(key, record=True):
+    cached = cache.get(key)
+    if record:
+        metrics.record_cache(cached is not None)
+    if cached is None:
+        return None
+    content, content_type = cached
+    return HttpResponse(content, content_type=content_type)
+
+
+def render_lock(key):
+    """Блокировка отрисовки страницы в процессе: одна на группу ключей."""
+    return _render_locks[hash(key) % LOCK_STRIPES]
+
+
+def cached_page(scope):
+    """Кэширует страницу на PAGE_TIMEOUT или до инвалидации области.
+
+    Пока страница отрисовывается, другие потоки процесса ждут её на
+    блокировке процесса. Между процессами ожидание держится на
+    cache.add: на FileBasedCache он не атомарен, и страницу изредка
+    отрисуют два процесса, что лишь повторит работу.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+            key = page_key(scope(*args, **kwargs), request)
+            response = from_cache(key)
+            if response is not None:
+                return response
+            with render_lock(key):
+                return render_page(key, view, request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render_page(key, view, request, *args, **kwargs):
+    """Отрисовывает страницу, если другой процесс не успел это сделать."""
+    # Страницу мог сохранить поток, державший блокировку до нас.
+    response = from_cache(key, record=False)
+    if response is not None:
+        return response
+    lock_key = f'{key}:lock'
+    for _ in range(LOCK_RETRIES):
+        locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+        if locked:
+            break
+        time.sleep(LOCK_WAIT)
+        response = from_cache(key)
+        if response is not None:
+            return response
+    try:
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            cached = (response.content, response['Content-Type'])
+            cache.set(key, cached, db.cache_timeout(PAGE_TIMEOUT))
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return response
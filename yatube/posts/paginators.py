@@ -0,0 +1,142 @@
+import base64
+import json
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Max
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+
+NEXT = 'n'
+PREVIOUS = 'p'
+ESTIMATE_FROM = 10000
+MAX_PK = 2 ** 63
+
+
+def encode_cursor(direction, obj, date_field='pub_date'):
+    """Упаковывает позицию объекта в непрозрачный токен для ?cursor=."""
+    moment = getattr(obj, date_field)
+    return dump_token([direction, moment.isoformat(), obj.pk])
+
+
+def dump_token(data):
+    """Непрозрачный токен курсора из данных, которые сериализует JSON."""
+    token = base64.urlsafe_b64encode(json.dumps(data).encode())
+    return token.decode().rstrip('=')
+
+
+def load_token(token):
+    """Данные из токена курсора; для битого токена — ValueError."""
+    padded = token + '=' * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+
+
+def valid_pk(pk):
+    """pk из токена: целое число, которое поместится в INTEGER SQLite."""
+    return type(pk) is int and 0 < pk < MAX_PK
+
+
+def decode_cursor(token):
+    """Возвращает (направление, дата, pk) или None для битого токена."""
+    if not token:
+        return None
+    try:
+        direction, moment, pk = load_token(token)
+        moment = parse_datetime(moment)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if direction not in (NEXT, PREVIOUS) or moment is None:
+        return None
+    if not valid_pk(pk):
+        return None
+    return direction, moment, pk
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (дата, id) без COUNT и OFFSET.
+
+    Стоимость страницы не зависит от её глубины: каждая страница —
+    это один запрос с условием по индексу и LIMIT per_page + 1.
+    """
+
+    is_cursor = True
+    date_field = 'pub_date'
+
+    def __init__(self, object_list, per_page):
+        super().__init__(
+            object_list.order_by(f'-{self.date_field}', '-pk'), per_page
+        )
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def seek(self, queryset, position, key='pk'):
+        """queryset, упорядоченный по (дата, key), с позиции position."""
+        direction, moment, pk = position
+        field = self.date_field
+        # Условие записано как диапазон по дате, а не через OR,
+        # чтобы SQLite искал начало страницы по индексу, а не сканировал.
+        if direction == NEXT:
+            return queryset.filter(
+                **{f'{field}__lte': moment}
+            ).exclude(**{field: moment, f'{key}__gte': pk})
+        return queryset.reverse().filter(
+            **{f'{field}__gte': moment}
+        ).exclude(**{field: moment, f'{key}__lte': pk})
+
+    def page_queryset(self, cursor):
+        """Запрос для страницы, начинающейся с позиции cursor."""
+        position = decode_cursor(cursor)
+        limit = self.per_page + 1
+        if position is None:
+            return NEXT, self.object_list[:limit]
+        return position[0], self.seek(self.object_list, position)[:limit]
+
+    def page_rows(self, cursor):
+        """Направление и до per_page + 1 объектов страницы."""
+        direction, queryset = self.page_queryset(cursor)
+        return direction, list(queryset)
+
+    def get_page(self, cursor):
+        """Возвращает страницу и заполняет ссылки на соседние."""
+        direction, rows = self.page_rows(cursor)
+        has_more = len(rows) > self.per_page
+        object_list = rows[:self.per_page]
+        if direction == PREVIOUS:
+            object_list.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(decode_cursor(cursor))
+        if object_list and has_next:
+            self.next_cursor = encode_cursor(
+                NEXT, object_list[-1], self.date_field
+            )
+        if object_list and has_previous:
+            self.previous_cursor = encode_cursor(
+                PREVIOUS, object_list[0], self.date_field
+            )
+        return Page(object_list, 1, self)
+
+
+class CommentPaginator(CursorPaginator):
+    """Комментарии записи по ключу (created, id)."""
+
+    date_field = 'created'
+
+
+class EstimatedCountPaginator(Paginator):
+    """Номерные страницы без COUNT(*) по всей большой таблице.
+
+    Для запроса без фильтров число строк оценивается по наибольшему id —
+    это один шаг по первичному ключу. Если оценка меньше ESTIMATE_FROM
+    или в запросе есть фильтры, считается точное число.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = queryset.model.objects.aggregate(
+                last=Max('pk')
+            )['last'] or 0
+            if estimate >= ESTIMATE_FROM:
+                return estimate
+        return super().count
@@ -0,0 +1,188 @@
+import math
+import re
+from functools import lru_cache
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+from .models import Post
+from .paginators import dump_token, load_token, valid_pk
+
+FTS_TABLE = 'posts_post_fts'
+WORD = re.compile(r'\w+')
+
+
+def terms(query):
+    """Слова запроса без операторов и кавычек."""
+    return WORD.findall(query.lower())
+
+
+def encode_cursor(score, pk):
+    return dump_token([score, pk])
+
+
+def decode_cursor(token):
+    """Возвращает (оценка, pk) или None для битого токена."""
+    if not token:
+        return None
+    try:
+        score, pk = load_token(token)
+        score = float(score)
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if not math.isfinite(score) or not valid_pk(pk):
+        return None
+    return score, pk
+
+
+class SearchBackend:
+    """Интерфейс поискового индекса записей.
+
+    search возвращает пары (оценка, pk), упорядоченные по возрастанию
+    оценки и pk: лучшие совпадения идут первыми.
+    """
+
+    def index(self, post):
+        raise NotImplementedError
+
+    def remove(self, post_id):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def index_many(self, rows):
+        """Добавляет пачку пар (pk, текст)."""
+        raise NotImplementedError
+
+    def search(self, words, group_id=None, author_id=None, after=None,
+               limit=10):
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """Инвертированный индекс SQLite FTS5, ранжирование по bm25."""
+
+    def index(self, post):
+        self.remove(post.pk)
+        self.index_many([(post.pk, post.text)])
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def index_many(self, rows):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, text) VALUES (%s, %s)',
+                rows,
+            )
+
+    def search(self, words, group_id=None, author_id=None, after=None,
+               limit=10):
+        # Каждое слово в кавычках, последнее — как префикс: так запрос
+        # пользователя не разбирается как синтаксис FTS5.
+        match = ' '.join(f'"{word}"' for word in words) + '*'
+        filters, params = [f'{FTS_TABLE} MATCH %s'], [match]
+        if group_id is not None:
+            filters.append('posts_post.group_id = %s')
+            params.append(group_id)
+        if author_id is not None:
+            filters.append('posts_post.author_id = %s')
+            params.append(author_id)
+        position = ''
+        if after is not None:
+            position = 'WHERE score > %s OR (score = %s AND id > %s)'
+            params.extend([after[0], after[0], after[1]])
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT score, id FROM ('
+                f'SELECT {FTS_TABLE}.rank AS score, {FTS_TABLE}.rowid AS id '
+                f'FROM {FTS_TABLE} '
+                f'JOIN posts_post ON posts_post.id = {FTS_TABLE}.rowid '
+                f'WHERE {" AND ".join(filters)}'
+                f') {position} ORDER BY score, id LIMIT %s',
+                params,
+            )
+            return cursor.fetchall()
+
+
+class LikeBackend(SearchBackend):
+    """Запасной вариант для баз без FTS: LIKE по тексту, новые первыми."""
+
+    def index(self, post):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def index_many(self, rows):
+        pass
+
+    def search(self, words, group_id=None, author_id=None, after=None,
+               limit=10):
+        posts = Post.objects.order_by('-pk')
+        for word in words:
+            posts = posts.filter(text__icontains=word)
+        if group_id is not None:
+            posts = posts.filter(group_id=group_id)
+        if author_id is not None:
+            posts = posts.filter(author_id=author_id)
+        if after is not None:
+            posts = posts.filter(pk__lt=after[1])
+        ids = posts.values_list('pk', flat=True)[:limit]
+        return [(-pk, pk) for pk in ids]
+
+
+@lru_cache(maxsize=None)
+def load_backend(path):
+    return import_string(path)()
+
+
+def backend():
+    return load_backend(settings.POSTS_SEARCH_BACKEND)
+
+
+def search(query, group_id=None, author_id=None, cursor=None, limit=10):
+    """Страница результатов: (id записей, курсор следующей страницы)."""
+    words = terms(query)
+    if not words:
+        return [], None
+    rows = backend().search(
+        words, group_id, author_id, decode_cursor(cursor), limit + 1
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*rows[-1])
+    return [pk for score, pk in rows], next_cursor
+
+
+def rebuild(batch_size=1000):
+    """Перестраивает индекс пачками по batch_size записей."""
+    index = backend()
+    rows = Post.objects.order_by('pk').values_list('pk', 'text').iterator(
+        chunk_size=batch_size
+    )
+    total = 0
+    with transaction.atomic():
+        index.clear()
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            index.index_many(batch)
+            total += len(batch)
+    return total
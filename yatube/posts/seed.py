@@ -0,0 +1,90 @@
+import random
+import uuid
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Max, Min
+from mixer.backend.django import mixer
+
+from .models import Comment, Follow, Group, Post, User
+
+
+def batches(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield range(start, min(start + batch_size, total))
+
+
+def last_pk(model):
+    return model.objects.aggregate(last=Max('pk'))['last'] or 0
+
+
+def seed(users=100, groups=10, posts=2000, follows=500, comments=1000,
+         batch_size=1000, random_seed=None):
+    """Заполняет базу случайными пользователями, группами и записями.
+
+    Пользователи и группы создаются через mixer, как в фикстурах тестов,
+    записи, подписки и комментарии — пачками через bulk_create. Затем
+    пересчитываются счётчики авторов, ленты подписок и поисковый индекс.
+    """
+    rnd = random.Random(random_seed)
+    prefix = uuid.uuid4().hex[:8]
+    authors = mixer.cycle(users).blend(
+        User,
+        username=mixer.sequence(lambda n: f'seed_{prefix}_{n}'),
+    )
+    seeded_groups = mixer.cycle(groups).blend(
+        Group,
+        slug=mixer.sequence(lambda n: f'seed-{prefix}-{n}'),
+    )
+    author_ids = [author.pk for author in authors]
+    group_ids = [group.pk for group in seeded_groups] + [None]
+    vocabulary = mixer.faker.words(500)
+
+    before = last_pk(Post)
+    for batch in batches(posts, batch_size):
+        Post.objects.bulk_create(
+            Post(
+                author_id=rnd.choice(author_ids),
+                group_id=rnd.choice(group_ids),
+                text=' '.join(rnd.choices(vocabulary, k=rnd.randint(5, 40))),
+            )
+            for _ in batch
+        )
+    # Счётчик автоинкремента может быть впереди Max(pk) (например, после
+    # очистки таблицы), поэтому границы берутся из вставленных строк.
+    inserted = Post.objects.filter(pk__gt=before).aggregate(
+        first=Min('pk'), last=Max('pk'),
+    )
+    post_ids = range(inserted['first'] or 1, (inserted['last'] or 0) + 1)
+
+    for batch in batches(follows, batch_size):
+        Follow.objects.bulk_create(
+            (
+                Follow(user_id=user_id, author_id=author_id)
+                for user_id, author_id in (
+                    rnd.sample(author_ids, 2) for _ in batch
+                )
+            ),
+            ignore_conflicts=True,
+        )
+
+    if post_ids:
+        for batch in batches(comments, batch_size):
+            Comment.objects.bulk_create(
+                Comment(
+                    post_id=rnd.choice(post_ids),
+                    author_id=rnd.choice(author_ids),
+                    text=' '.join(rnd.choices(vocabulary, k=8)),
+                )
+                for _ in batch
+            )
+
+    call_command('rebuild_author_stats', stdout=StringIO())
+    call_command('rebuild_group_stats', stdout=StringIO())
+    call_command('rebuild_timelines', stdout=StringIO())
+    call_command('rebuild_search_index', stdout=StringIO())
+    return {
+        'users': authors,
+        'groups': seeded_groups,
+        'post_ids': post_ids,
+    }
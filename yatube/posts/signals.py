@@ -0,0 +1,311 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import (
+    follows, fragments, group_stats, page_cache, search, tasks, thumbnails,
+    timeline
+)
+from .models import (
+    AuthorStats, Comment, Follow, Group, Post, PostThumbnail, User
+)
+
+
+def only_last_login(update_fields):
+    """Сохранение пользователя при входе ничего не меняет на страницах."""
+    return bool(update_fields) and set(update_fields) == {'last_login'}
+
+
+def author_counts(author_id):
+    """Подсчёт счётчиков автора по таблицам для get_or_create.
+
+    Значения — функции: COUNT выполняется, только если строку создают.
+    """
+    return {
+        'post_count': Post.objects.filter(author_id=author_id).count,
+        'comment_count': Comment.objects.filter(author_id=author_id).count,
+        'follower_count': Follow.objects.filter(author_id=author_id).count,
+    }
+
+
+def change_author_stat(author_id, field, delta):
+    """Сдвигает счётчик автора на delta в транзакции изменения.
+
+    Строка, которой ещё нет, создаётся сразу с настоящими числами:
+    изменение уже записано, поэтому сдвигать их не нужно.
+    """
+    with transaction.atomic():
+        stats = AuthorStats.objects.filter(author_id=author_id)
+        if delta > 0:
+            _, created = AuthorStats.objects.get_or_create(
+                author_id=author_id, defaults=author_counts(author_id)
+            )
+            if created:
+                return
+        else:
+            stats = stats.filter(**{f'{field}__gte': -delta})
+        stats.update(**{field: F(field) + delta})
+
+
+@receiver(post_save, sender=Post)
+def post_created(sender, instance, created, **kwargs):
+    if created:
+        change_author_stat(instance.author_id, 'post_count', 1)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    change_author_stat(instance.author_id, 'post_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def post_group_stats(sender, instance, created, **kwargs):
+    previous = None if created else getattr(
+        instance, '_previous_group_id', None
+    )
+    if previous == instance.group_id:
+        return
+    if previous:
+        group_stats.remove_post(
+            previous, instance.author_id, instance.pub_date
+        )
+    if instance.group_id:
+        group_stats.add_post(
+            instance.group_id, instance.author_id, instance.pub_date
+        )
+
+
+@receiver(post_delete, sender=Post)
+def post_group_stats_removed(sender, instance, **kwargs):
+    if instance.group_id:
+        group_stats.remove_post(
+            instance.group_id, instance.author_id, instance.pub_date
+        )
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        change_author_stat(instance.author_id, 'comment_count', 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    change_author_stat(instance.author_id, 'comment_count', -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        change_author_stat(instance.author_id, 'follower_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    change_author_stat(instance.author_id, 'follower_count', -1)
+
+
+@receiver(post_save, sender=Post)
+def post_fan_out(sender, instance, created, **kwargs):
+    if created:
+        tasks.schedule_fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_backfill(sender, instance, created, **kwargs):
+    if created:
+        tasks.schedule_backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_remove_from_timeline(sender, instance, **kwargs):
+    timeline.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_author_unpopular(sender, instance, **kwargs):
+    """Автор опустился ниже POSTS_FANOUT_LIMIT: ленты досылаются.
+
+    Счётчик к этому моменту уже уменьшен в follow_deleted.
+    """
+    count = AuthorStats.objects.filter(
+        author_id=instance.author_id
+    ).values_list('follower_count', flat=True).first()
+    if count == settings.POSTS_FANOUT_LIMIT - 1:
+        tasks.schedule_backfill_followers(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def post_card_changed(sender, instance, created, **kwargs):
+    if not created:
+        fragments.bump_generation('post', instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def post_card_commented(sender, instance, created, **kwargs):
+    if created:
+        fragments.bump_generation('post', instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def post_card_uncommented(sender, instance, **kwargs):
+    fragments.bump_generation('post', instance.post_id)
+
+
+@receiver(post_save, sender=Group)
+def group_cards_changed(sender, instance, **kwargs):
+    fragments.bump_generation('group', instance.pk)
+
+
+@receiver(post_save, sender=User)
+def author_cards_changed(sender, instance, update_fields=None, **kwargs):
+    if only_last_login(update_fields):
+        return
+    fragments.bump_generation('author', instance.pk)
+
+
+def author_page_scopes(author_id, *usernames):
+    """Страницы, на которых видны карточки автора."""
+    slugs = Group.objects.filter(
+        posts__author_id=author_id
+    ).values_list('slug', flat=True).distinct()
+    return [
+        page_cache.index_scope(),
+        *map(page_cache.profile_scope, filter(None, usernames)),
+        *map(page_cache.group_scope, slugs),
+    ]
+
+
+def group_page_scopes(group, *slugs):
+    """Страницы, на которых видны карточки группы."""
+    usernames = User.objects.filter(
+        posts__group=group
+    ).values_list('username', flat=True).distinct()
+    return [
+        page_cache.index_scope(),
+        *map(page_cache.group_scope, filter(None, slugs)),
+        *map(page_cache.profile_scope, usernames),
+    ]
+
+
+def previous_value(instance, field):
+    if instance.pk is None:
+        return None
+    return type(instance).objects.filter(
+        pk=instance.pk
+    ).values_list(field, flat=True).first()
+
+
+@receiver(pre_save, sender=Post)
+def post_remember_group(sender, instance, **kwargs):
+    instance._previous_group_id = previous_value(instance, 'group_id')
+
+
+def invalidate_post_pages(post, previous_group_id=None):
+    username = User.objects.filter(
+        pk=post.author_id
+    ).values_list('username', flat=True).first()
+    slugs = Group.objects.filter(
+        pk__in={post.group_id, previous_group_id}
+    ).values_list('slug', flat=True)
+    page_cache.invalidate(
+        *author_page_scopes(post.author_id, username),
+        *map(page_cache.group_scope, slugs),
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def post_pages_changed(sender, instance, **kwargs):
+    invalidate_post_pages(
+        instance, getattr(instance, '_previous_group_id', None)
+    )
+
+
+@receiver(pre_save, sender=Group)
+def group_remember_slug(sender, instance, **kwargs):
+    instance._previous_slug = previous_value(instance, 'slug')
+
+
+@receiver(post_save, sender=Group)
+def group_pages_changed(sender, instance, **kwargs):
+    page_cache.invalidate(
+        *group_page_scopes(instance, instance.slug, instance._previous_slug)
+    )
+
+
+@receiver(pre_delete, sender=Group)
+def group_pages_deleted(sender, instance, **kwargs):
+    page_cache.invalidate(*group_page_scopes(instance, instance.slug))
+
+
+@receiver(pre_save, sender=User)
+def author_remember_username(sender, instance, update_fields=None, **kwargs):
+    if only_last_login(update_fields):
+        return
+    instance._previous_username = previous_value(instance, 'username')
+
+
+@receiver(post_save, sender=User)
+def author_pages_changed(sender, instance, created, update_fields=None,
+                         **kwargs):
+    if created or only_last_login(update_fields):
+        return
+    page_cache.invalidate(*author_page_scopes(
+        instance.pk, instance.username, instance._previous_username
+    ))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def follow_pages_changed(sender, instance, **kwargs):
+    username = User.objects.filter(
+        pk=instance.author_id
+    ).values_list('username', flat=True).first()
+    if username:
+        page_cache.invalidate(page_cache.profile_scope(username))
+
+
+@receiver(post_save, sender=Follow)
+def follow_graph_added(sender, instance, created, **kwargs):
+    if created:
+        follows.changed(instance.user_id, instance.author_id, True)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_graph_removed(sender, instance, **kwargs):
+    follows.changed(instance.user_id, instance.author_id, False)
+
+
+@receiver(post_save, sender=Post)
+def post_schedule_thumbnails(sender, instance, **kwargs):
+    thumbnails.schedule(instance)
+
+
+@receiver(post_save, sender=PostThumbnail)
+def thumbnail_ready(sender, instance, **kwargs):
+    if instance.status != PostThumbnail.READY:
+        return
+    # Страницы сбрасываются, когда готова картинка карточки и когда
+    # достроен последний вариант, а не после каждого из них.
+    pending = PostThumbnail.objects.filter(
+        post_id=instance.post_id, status=PostThumbnail.PENDING
+    )
+    if not thumbnails.is_card(instance) and pending.exists():
+        return
+    fragments.bump_generation('post', instance.post_id)
+    invalidate_post_pages(instance.post)
+
+
+@receiver(post_save, sender=Post)
+def post_search_index(sender, instance, **kwargs):
+    search.backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_search_remove(sender, instance, **kwargs):
+    search.backend().remove(instance.pk)
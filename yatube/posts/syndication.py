@@ -0,0 +1,202 @@
+from itertools import chain
+from xml.sax.saxutils import escape, quoteattr
+
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import rfc2822_date, rfc3339_date
+from django.utils.text import Truncator
+from django.views.decorators.http import condition
+
+from core.cache import CacheProxy
+from core.db import cache_timeout, replica_reads
+
+from .conditional import make_etag
+from .models import Group, Post, User
+from .page_cache import (
+    group_scope, index_scope, profile_scope, scope_generation
+)
+
+FEED_ITEMS = 50
+FEED_TIMEOUT = 60 * 60
+TITLE_WORDS = 10
+FEED_FIELDS = (
+    'id', 'text', 'pub_date', 'author__username', 'author__first_name',
+    'author__last_name', 'group__title',
+)
+CONTENT_TYPES = {
+    'rss': 'application/rss+xml; charset=utf-8',
+    'atom': 'application/atom+xml; charset=utf-8',
+}
+
+cache = CacheProxy('posts')
+
+
+def feed_posts(posts):
+    """Последние записи ленты: только нужные поля, чтение курсором."""
+    return posts.select_related('author', 'group').only(
+        *FEED_FIELDS
+    ).order_by('-pub_date', '-pk')[:FEED_ITEMS].iterator()
+
+
+def item_title(post):
+    return Truncator(post.text).words(TITLE_WORDS)
+
+
+def author_name(post):
+    return post.author.get_full_name() or post.author.username
+
+
+def rss(site, path, title, link, posts, updated):
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<rss version="2.0"><channel>'
+        f'<title>{escape(title)}</title>'
+        f'<link>{escape(site + link)}</link>'
+        f'<description>{escape(title)}</description>'
+        '<language>ru</language>'
+    )
+    if updated is not None:
+        yield f'<lastBuildDate>{rfc2822_date(updated)}</lastBuildDate>'
+    for post in posts:
+        url = escape(site + reverse('posts:post_detail', args=[post.pk]))
+        category = ''
+        if post.group_id:
+            category = f'<category>{escape(post.group.title)}</category>'
+        yield (
+            '<item>'
+            f'<title>{escape(item_title(post))}</title>'
+            f'<link>{url}</link>'
+            f'<guid>{url}</guid>'
+            f'<description>{escape(post.text)}</description>'
+            f'<author>{escape(author_name(post))}</author>'
+            f'{category}'
+            f'<pubDate>{rfc2822_date(post.pub_date)}</pubDate>'
+            '</item>'
+        )
+    yield '</channel></rss>\n'
+
+
+def atom(site, path, title, link, posts, updated):
+    link = escape(site + link)
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom" xml:lang="ru">'
+        f'<title>{escape(title)}</title>'
+        f'<link href="{link}" rel="alternate"/>'
+        f'<link href={quoteattr(site + path)} rel="self"/>'
+        f'<id>{link}</id>'
+    )
+    if updated is not None:
+        yield f'<updated>{rfc3339_date(updated)}</updated>'
+    for post in posts:
+        url = escape(site + reverse('posts:post_detail', args=[post.pk]))
+        category = ''
+        if post.group_id:
+            category = f'<category term={quoteattr(post.group.title)}/>'
+        yield (
+            '<entry>'
+            f'<title>{escape(item_title(post))}</title>'
+            f'<link href="{url}" rel="alternate"/>'
+            f'<id>{url}</id>'
+            f'<updated>{rfc3339_date(post.pub_date)}</updated>'
+            f'<author><name>{escape(author_name(post))}</name></author>'
+            f'{category}'
+            f'<summary>{escape(post.text)}</summary>'
+            '</entry>'
+        )
+    yield '</feed>\n'
+
+
+WRITERS = {'rss': rss, 'atom': atom}
+
+
+def site_root(request):
+    """Схема и хост запроса; хост уже проверен по ALLOWED_HOSTS."""
+    return f'{request.scheme}://{request.get_host()}'
+
+
+def feed_key(fmt, scope, site):
+    return f'syndication:{fmt}:{scope}:{site}:{scope_generation(scope)}'
+
+
+def feed_etag(scope):
+    def etag(request, *args, fmt, **kwargs):
+        page_scope = scope(*args, **kwargs)
+        return make_etag(
+            'feed', fmt, page_scope, scope_generation(page_scope)
+        )
+    return etag
+
+
+def store(key, chunks, timeout):
+    """Отдаёт части документа и кэширует его целиком, если поток дочитан.
+
+    Срок вычисляется заранее: поток дочитывается уже после ответа, когда
+    ReplicaMiddleware сбросил состояние запроса.
+    """
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    cache.set(key, ''.join(parts), timeout)
+
+
+def feed_response(request, fmt, scope, title, link, posts):
+    """Лента из кэша или потоком из базы с сохранением в кэш.
+
+    Кэш привязан к поколению области, которое меняется вместе с кэшем
+    HTML-страниц той же ленты, например при новой записи. Ссылки
+    документа абсолютные, поэтому хост входит в ключ, а строка запроса
+    в ссылки не попадает.
+    """
+    if fmt not in WRITERS:
+        raise Http404('Неизвестный формат ленты.')
+    site = site_root(request)
+    key = feed_key(fmt, scope, site)
+    cached = cache.get(key)
+    if cached is not None:
+        return HttpResponse(cached, content_type=CONTENT_TYPES[fmt])
+    posts = feed_posts(posts)
+    first = next(posts, None)
+    updated = None
+    if first is not None:
+        posts, updated = chain([first], posts), first.pub_date
+    chunks = WRITERS[fmt](site, request.path, title, link, posts, updated)
+    return StreamingHttpResponse(
+        store(key, chunks, cache_timeout(FEED_TIMEOUT)),
+        content_type=CONTENT_TYPES[fmt],
+    )
+
+
+@replica_reads
+@condition(etag_func=feed_etag(index_scope))
+def index(request, fmt):
+    return feed_response(
+        request, fmt, index_scope(), 'Последние обновления на сайте',
+        reverse('posts:index'), Post.objects.all(),
+    )
+
+
+@replica_reads
+@condition(etag_func=feed_etag(group_scope))
+def group(request, slug, fmt):
+    group = get_object_or_404(Group.objects.only('pk', 'title'), slug=slug)
+    return feed_response(
+        request, fmt, group_scope(slug), f'Записи сообщества {group.title}',
+        reverse('posts:group_list', args=[slug]), group.posts.all(),
+    )
+
+
+@replica_reads
+@condition(etag_func=feed_etag(profile_scope))
+def profile(request, username, fmt):
+    author = get_object_or_404(
+        User.objects.only('pk', 'username', 'first_name', 'last_name'),
+        username=username,
+    )
+    name = author.get_full_name() or author.username
+    return feed_response(
+        request, fmt, profile_scope(username), f'Записи {name}',
+        reverse('posts:profile', args=[username]), author.posts.all(),
+    )
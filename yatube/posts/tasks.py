@@ -0,0 +1,40 @@
+from core.jobs import enqueue, task
+
+from . import timeline
+from .models import Follow, Post
+
+
+@task('posts.fan_out')
+def fan_out(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        timeline.fan_out(post)
+
+
+@task('posts.backfill')
+def backfill(follow_id):
+    # Подписка могла быть отменена, пока задача ждала в очереди.
+    follow = Follow.objects.filter(pk=follow_id).first()
+    if follow is not None:
+        timeline.backfill(follow.user_id, follow.author_id)
+
+
+@task('posts.backfill_followers')
+def backfill_followers(author_id):
+    timeline.backfill_followers(author_id)
+
+
+def schedule_fan_out(post):
+    enqueue('posts.fan_out', {'post_id': post.pk}, key=f'fan_out:{post.pk}')
+
+
+def schedule_backfill(follow):
+    enqueue(
+        'posts.backfill',
+        {'follow_id': follow.pk},
+        key=f'backfill:{follow.pk}',
+    )
+
+
+def schedule_backfill_followers(author_id):
+    enqueue('posts.backfill_followers', {'author_id': author_id})
@@ -0,0 +1,51 @@
+from django import template
+
+from posts.fragments import render_card
+from posts.models import PostThumbnail
+from posts.thumbnails import (
+    CARD_SIZES, MIME_TYPES, card_sources, card_thumbnail
+)
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card(post):
+    return render_card(post)
+
+
+@register.inclusion_tag('includes/follow_link.html', takes_context=True)
+def follow_link(context, author):
+    """Кнопка подписки рядом с карточкой, но не внутри неё.
+
+    Карточка кэшируется одна на всех, а состояние подписки у каждого
+    зрителя своё: его берут из множества followed, собранного
+    представлением для всей страницы.
+    """
+    user = context['user']
+    followed = context.get('followed')
+    return {
+        'author': author,
+        'show': (
+            followed is not None
+            and user.is_authenticated
+            and author.pk != user.pk
+        ),
+        'following': followed is not None and author.pk in followed,
+    }
+
+
+@register.inclusion_tag('includes/thumbnail.html')
+def post_thumbnail(post):
+    sources = card_sources(post)
+    jpeg = sources.pop(PostThumbnail.JPEG, '')
+    return {
+        'post': post,
+        'thumbnail': card_thumbnail(post),
+        'sources': [
+            {'type': MIME_TYPES[image_format], 'srcset': value}
+            for image_format, value in sources.items()
+        ],
+        'srcset': jpeg,
+        'sizes': CARD_SIZES,
+    }
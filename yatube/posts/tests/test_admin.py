@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import paginators
+from posts.models import Group, Post
+from posts.paginators import EstimatedCountPaginator
+
+User = get_user_model()
+
+
+class PostAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.groups = [
+            Group.objects.create(title=f'Группа {i}', slug=f'group-{i}')
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:posts_post_changelist')
+
+    def create_posts(self, count):
+        Post.objects.bulk_create(
+            Post(author=self.admin, group=self.groups[i % 5], text=f'{i}')
+            for i in range(count)
+        )
+
+    def changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Авторы, группы и варианты выбора группы читаются один раз."""
+        self.create_posts(3)
+        few = self.changelist_queries()
+        self.create_posts(30)
+        self.assertEqual(self.changelist_queries(), few)
+
+    def test_export_csv_streams_selected_posts(self):
+        self.create_posts(4)
+        selected = list(Post.objects.values_list('pk', flat=True)[:2])
+        response = self.client.post(self.url, {
+            'action': 'export_csv',
+            helpers.ACTION_CHECKBOX_NAME: selected,
+        })
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,text,pub_date,author,group,image')
+        self.assertEqual(len(lines), 3)
+
+    def test_estimated_count(self):
+        """Без фильтров число строк оценивается по наибольшему id."""
+        self.create_posts(3)
+        last = Post.objects.order_by('-pk').first().pk
+        Post.objects.filter(pk=last - 1).delete()
+        filtered = Post.objects.filter(group=self.groups[0])
+        with mock.patch.object(paginators, 'ESTIMATE_FROM', 1):
+            with CaptureQueriesContext(connection) as queries:
+                count = EstimatedCountPaginator(Post.objects.all(), 10).count
+            self.assertEqual(
+                EstimatedCountPaginator(filtered, 10).count, filtered.count()
+            )
+        self.assertEqual(count, last)
+        self.assertNotIn('COUNT(', queries.captured_queries[0]['sql'])
@@ -0,0 +1,135 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(JOBS_SYNC=True)
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-group',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'Запись {i}')
+            for i in range(25)
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Последняя'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds_are_paginated_json(self):
+        """Ленты отдают компактные записи страницами по курсору."""
+        urls = (
+            (self.client, reverse('posts:api_index')),
+            (self.client, reverse(
+                'posts:api_group', kwargs={'slug': 'test-group'}
+            )),
+            (self.client, reverse(
+                'posts:api_profile', kwargs={'username': 'auth'}
+            )),
+            (self.reader_client, reverse('posts:api_follow')),
+        )
+        for client, url in urls:
+            with self.subTest(url=url):
+                data = client.get(url).json()
+                self.assertEqual(len(data['results']), 20)
+                self.assertEqual(data['results'][0], {
+                    'id': self.post.pk,
+                    'text': 'Последняя',
+                    'pub_date': self.post.pub_date.isoformat(),
+                    'author': 'auth',
+                    'group': 'test-group',
+                    'image': None,
+                })
+                rest = client.get(url, {'cursor': data['next_cursor']})
+                self.assertEqual(len(rest.json()['results']), 6)
+
+    def test_unchanged_feed_is_not_modified(self):
+        """Повторный запрос с тем же ETag — 304 без запросов к базе."""
+        url = reverse('posts:api_index')
+        etag = self.client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 0)
+        self.post.text = 'Изменённая'
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_etag_follows_comments(self):
+        """ETag записи меняется вместе с числом комментариев."""
+        url = reverse('posts:api_post', kwargs={'post_id': self.post.pk})
+        response = self.client.get(url)
+        self.assertEqual(response.json()['comment_count'], 0)
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        Comment.objects.create(post=self.post, author=self.user, text='Да')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['comment_count'], 1)
+
+    def test_follow_feed(self):
+        """Лента подписок зависит от пользователя и требует входа."""
+        url = reverse('posts:api_follow')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        response = self.reader_client.get(url)
+        self.assertIn('Cookie', response['Vary'])
+        etag = response['ETag']
+        self.assertEqual(
+            self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            304
+        )
+        Post.objects.create(author=self.user, text='Новая')
+        self.assertEqual(
+            self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            200
+        )
+
+    def test_follow_etag_without_page_query(self):
+        """ETag ленты подписок не читает записи и следит за группами."""
+        url = reverse('posts:api_follow')
+        etag = self.reader_client.get(url)['ETag']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(
+            [query for query in queries if 'posts_' in query['sql']]
+        )
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.save()
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['group'], 'renamed')
+
+    def test_missing_objects(self):
+        for url in (
+            reverse('posts:api_group', kwargs={'slug': 'missing'}),
+            reverse('posts:api_profile', kwargs={'username': 'missing'}),
+            reverse('posts:api_post', kwargs={'post_id': 0}),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,183 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import fragments, page_cache
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-group',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовая запись',
+            group=cls.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        fragments.stats.clear()
+
+    def render(self):
+        post = Post.objects.select_related('author', 'group').get(
+            pk=self.post.pk
+        )
+        return fragments.render_card(post)
+
+    def test_card_is_served_from_cache(self):
+        """Повторная отрисовка карточки берётся из кэша."""
+        first = self.render()
+        second = self.render()
+        self.assertEqual(first, second)
+        self.assertEqual(fragments.stats['hits'], 1)
+        self.assertEqual(fragments.stats['misses'], 1)
+        self.assertEqual(fragments.hit_rate(), 0.5)
+
+    def test_changes_bump_generation(self):
+        """Правка записи, комментарий, группа и автор сбрасывают карточку."""
+        changes = {
+            'post': lambda: Post.objects.get(pk=self.post.pk).save(),
+            'comment': lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='Комментарий'
+            ),
+            'group': lambda: self.group.save(),
+            'author': lambda: self.user.save(),
+        }
+        for name, change in changes.items():
+            with self.subTest(change=name):
+                self.render()
+                fragments.stats.clear()
+                change()
+                self.render()
+                self.assertEqual(fragments.stats['misses'], 1)
+
+    def test_concurrent_bumps_get_distinct_generations(self):
+        """Одновременные смены поколения не совпадают и не истекают."""
+        key = fragments.generation_key('post', self.post.pk)
+        with mock.patch.object(
+            fragments.cache, 'set', wraps=fragments.cache.set
+        ) as cache_set:
+            first = fragments.bump_generation('post', self.post.pk)
+            second = fragments.bump_generation('post', self.post.pk)
+        self.assertNotEqual(first, second)
+        cache_set.assert_called_with(key, second, None)
+
+    def test_generation_added_by_other_worker_is_used(self):
+        """Если поколение уже завёл другой воркер, берётся его значение."""
+        key = fragments.generation_key('post', self.post.pk)
+        cache.set(key, 'other', None)
+        with mock.patch.object(fragments.cache, 'get_many', return_value={}):
+            self.assertEqual(fragments.get_generations([key]), ['other'])
+
+    def test_card_shows_new_text_after_edit(self):
+        """После правки в карточке новый текст."""
+        self.render()
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленная запись'
+        post.save()
+        self.assertIn('Исправленная запись', self.render())
+
+
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-group',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовая запись',
+            group=cls.group,
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-group'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_are_cached_until_change(self):
+        """Страницы берутся из кэша, пока записи не менялись."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertIsNotNone(self.client.get(url).context)
+                self.assertIsNone(self.client.get(url).context)
+
+    def test_new_post_invalidates_pages(self):
+        """Новая запись сразу видна на всех страницах."""
+        for url in self.urls:
+            self.client.get(url)
+        Post.objects.create(
+            author=self.user, text='Свежая запись', group=self.group
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Свежая запись')
+
+    def test_group_change_invalidates_both_groups(self):
+        """Перенос записи в другую группу сбрасывает обе страницы групп."""
+        other = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание'
+        )
+        old_url = reverse('posts:group_list', kwargs={'slug': 'test-group'})
+        new_url = reverse('posts:group_list', kwargs={'slug': 'other'})
+        self.client.get(old_url)
+        self.client.get(new_url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = other
+        post.save()
+        self.assertNotContains(self.client.get(old_url), 'Тестовая запись')
+        self.assertContains(self.client.get(new_url), 'Тестовая запись')
+
+    def test_viewers_get_separate_pages(self):
+        """Гость и пользователь не получают страницы друг друга."""
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        self.client.get(self.urls[0])
+        response = reader_client.get(self.urls[0])
+        self.assertContains(response, 'Пользователь: reader')
+
+    def test_follow_invalidates_profile(self):
+        """Подписка сразу меняет кнопку на странице автора."""
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        url = self.urls[2]
+        reader_client.get(url)
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertIsNotNone(reader_client.get(url).context)
+
+    def test_pages_expire(self):
+        """Страница живёт PAGE_TIMEOUT, списков ключей области нет."""
+        with mock.patch.object(
+            page_cache.cache, 'set', wraps=page_cache.cache.set
+        ) as cache_set:
+            self.client.get(self.urls[0])
+        timeouts = [
+            args[2] for args, _ in cache_set.call_args_list
+            if args[0].startswith('page:')
+        ]
+        self.assertEqual(timeouts, [page_cache.PAGE_TIMEOUT])
+        self.assertFalse(any(
+            args[0].startswith('page_keys:')
+            for args, _ in cache_set.call_args_list
+        ))
@@ -0,0 +1,219 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+
+from posts.models import Comment, Follow, Group, ImportedId, Post
+from posts.seed import seed
+
+
+class ExplainFeedsTest(TestCase):
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент не читают таблицы целиком."""
+        out = StringIO()
+        call_command('explain_feeds', posts=300, users=20, stdout=out)
+        self.assertIn('все используют индексы', out.getvalue())
+        self.assertFalse(Post.objects.exists())
+
+
+class BenchFeedsTest(TestCase):
+    def test_results_are_saved_as_json(self):
+        """Замеры сохраняются в JSON и сравниваются с прошлым прогоном."""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            options = {
+                'posts': 60, 'users': 6, 'follows': 20, 'comments': 20,
+                'requests': 2, 'stdout': StringIO(),
+            }
+            call_command('bench_feeds', output=output, **options)
+            out = StringIO()
+            options['stdout'] = out
+            call_command('bench_feeds', compare=output, **options)
+            with open(output) as result_file:
+                result = json.load(result_file)
+        self.assertEqual(
+            set(result['results']),
+            {'index', 'index_deep', 'group_post', 'profile', 'post_detail',
+             'follow_index'}
+        )
+        for view, stats in result['results'].items():
+            with self.subTest(view=view):
+                self.assertLessEqual(
+                    stats['cold']['p50_ms'], stats['cold']['p99_ms']
+                )
+                self.assertGreater(stats['cold']['queries'], 0)
+                self.assertGreater(stats['allocated_kb'], 0)
+        self.assertIn('index: p50_ms', out.getvalue())
+        self.assertFalse(Post.objects.exists())
+
+
+class BenchServingTest(TransactionTestCase):
+    def test_compares_wsgi_and_asgi(self):
+        """Замеры для обоих режимов, тестовые данные удаляются."""
+        out = StringIO()
+        call_command(
+            'bench_serving', posts=30, users=5, requests=8, concurrency=4,
+            workers=2, stdout=out,
+        )
+        self.assertIn("wsgi: {'requests_per_s'", out.getvalue())
+        self.assertIn("'errors': 0", out.getvalue())
+        self.assertFalse(Post.objects.exists())
+
+
+class TransferCommandsTest(TestCase):
+    MODELS = {'group': Group, 'post': Post, 'comment': Comment,
+              'follow': Follow}
+
+    def setUp(self):
+        seed(users=5, groups=2, posts=30, follows=8, comments=20,
+             random_seed=0)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def snapshot(self):
+        return {
+            'post': set(Post.objects.values_list(
+                'text', 'pub_date', 'author__username', 'group__slug'
+            )),
+            'comment': set(Comment.objects.values_list(
+                'post__text', 'post__pub_date', 'author__username', 'text',
+                'created',
+            )),
+            'follow': set(Follow.objects.values_list(
+                'user__username', 'author__username'
+            )),
+            'group': set(Group.objects.values_list('slug', 'title')),
+        }
+
+    def test_round_trip(self):
+        """Выгруженные данные загружаются обратно с теми же связями и датами.
+
+        Группы получают новые id, поэтому записи привязываются по slug,
+        а комментарии — по новым id записей.
+        """
+        for file_format in ('jsonl', 'csv'):
+            with self.subTest(file_format=file_format):
+                expected = self.snapshot()
+                for name in self.MODELS:
+                    call_command(
+                        'export_data', name,
+                        self.path(f'{name}.{file_format}'),
+                        chunk_size=7, stdout=StringIO(),
+                    )
+                Group.objects.all().delete()
+                Post.objects.all().delete()
+                Follow.objects.all().delete()
+                ImportedId.objects.all().delete()
+                Group.objects.create(title='Чужая', slug='other')
+                for name in self.MODELS:
+                    call_command(
+                        'import_data', name,
+                        self.path(f'{name}.{file_format}'),
+                        batch_size=7, stdout=StringIO(),
+                    )
+                Group.objects.filter(slug='other').delete()
+                self.assertEqual(self.snapshot(), expected)
+
+    def test_repeated_import_and_dangling_links(self):
+        """Повтор не дублирует строки, ссылки на отсутствующее пропускаются."""
+        for name in ('post', 'comment'):
+            call_command('export_data', name, self.path(f'{name}.jsonl'),
+                         stdout=StringIO())
+        with open(self.path('post.jsonl'), 'a') as posts:
+            posts.write(json.dumps({
+                'id': 1000, 'text': 'Без группы', 'pub_date': None,
+                'author': 'missing', 'group': None, 'image': '',
+            }) + '\n')
+        with open(self.path('comment.jsonl'), 'a') as comments:
+            comments.write(json.dumps({
+                'id': 1000, 'post': 1000, 'author': Post.objects.first(
+                ).author.username, 'text': 'Ничей', 'created': None,
+            }) + '\n')
+        Post.objects.all().delete()
+        for name in ('post', 'comment'):
+            call_command('import_data', name, self.path(f'{name}.jsonl'),
+                         no_rebuild=True, stdout=StringIO())
+        self.assertEqual(Post.objects.count(), 30)
+        self.assertEqual(Comment.objects.count(), 20)
+        out = StringIO()
+        call_command('import_data', 'comment', self.path('comment.jsonl'),
+                     no_rebuild=True, stdout=out)
+        self.assertEqual(Comment.objects.count(), 20)
+        self.assertIn('Уже загружено раньше: 20', out.getvalue())
+        self.assertIn('Пропущено без связанного объекта post: 1',
+                      out.getvalue())
+
+    def test_reused_ids_do_not_keep_old_mapping(self):
+        """id удалённой записи выдаётся заново без старого соответствия."""
+        call_command('export_data', 'post', self.path('post.jsonl'),
+                     stdout=StringIO())
+        Post.objects.all().delete()
+        call_command('import_data', 'post', self.path('post.jsonl'),
+                     no_rebuild=True, stdout=StringIO())
+        last = Post.objects.latest('pk').pk
+        source = ImportedId.objects.get(model='post', object_id=last)
+        Post.objects.filter(pk=last).delete()
+        with open(self.path('new.jsonl'), 'w') as posts:
+            posts.write(json.dumps({
+                'id': 5000, 'text': 'Новая', 'pub_date': None,
+                'author': Post.objects.first().author.username,
+                'group': None, 'image': '',
+            }) + '\n')
+        call_command('import_data', 'post', self.path('new.jsonl'),
+                     no_rebuild=True, stdout=StringIO())
+        self.assertEqual(Post.objects.latest('pk').pk, last)
+        self.assertFalse(ImportedId.objects.filter(
+            model='post', source_id=source.source_id
+        ).exists())
+
+    def test_rebuilds_only_affected_data(self):
+        """После загрузки пересчитывается только то, что от неё зависит."""
+        expected = {
+            'group': [],
+            'comment': ['rebuild_author_stats'],
+            'follow': ['rebuild_author_stats', 'rebuild_timelines'],
+        }
+        for name, commands in expected.items():
+            with self.subTest(name=name):
+                path = self.path(f'{name}.jsonl')
+                call_command('export_data', name, path, stdout=StringIO())
+                with mock.patch(
+                    'posts.management.commands.import_data.call_command'
+                ) as rebuild:
+                    call_command('import_data', name, path,
+                                 stdout=StringIO())
+                self.assertEqual(
+                    [call.args[0] for call in rebuild.call_args_list],
+                    commands,
+                )
+
+    def test_checkpoints_resume(self):
+        """Повторный запуск продолжает с сохранённой позиции."""
+        checkpoint = self.path('export.checkpoint')
+        path = self.path('posts.jsonl')
+        call_command('export_data', 'post', path, checkpoint=checkpoint,
+                     stdout=StringIO())
+        Post.objects.create(
+            author=Post.objects.first().author, text='Новая запись'
+        )
+        call_command('export_data', 'post', path, checkpoint=checkpoint,
+                     stdout=StringIO())
+        with open(path) as exported:
+            self.assertEqual(len(exported.readlines()), 31)
+
+        checkpoint = self.path('import.checkpoint')
+        with open(checkpoint, 'w') as position:
+            json.dump({'model': 'post', 'position': 29}, position)
+        Post.objects.all().delete()
+        out = StringIO()
+        call_command('import_data', 'post', path, checkpoint=checkpoint,
+                     stdout=out)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertIn('строк/с', out.getvalue())
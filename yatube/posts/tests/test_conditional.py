@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-group',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Тестовая запись'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-group'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+
+    def test_pages_answer_not_modified(self):
+        """С тем же ETag страница отвечает 304 без шаблона."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertIn('Cookie', response['Vary'])
+                self.assertIn('public', response['Cache-Control'])
+                self.assertFalse(response.has_header('Last-Modified'))
+                with self.assertTemplateNotUsed('base.html'):
+                    repeated = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=response['ETag']
+                    )
+                self.assertEqual(repeated.status_code, 304)
+                self.assertIn('Cookie', repeated['Vary'])
+
+    def test_if_modified_since_alone(self):
+        """Без Last-Modified удаление записи не прячется за 304."""
+        Post.objects.filter(pk=self.post.pk).delete()
+        for url in self.urls[:-1]:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=http_date()
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_viewers_get_different_etags(self):
+        """Вошедший пользователь получает свой ETag и private-ответ."""
+        for url in self.urls:
+            with self.subTest(url=url):
+                guest = self.guest_client.get(url)
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=guest['ETag']
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('private', response['Cache-Control'])
+
+    def test_changes_refresh_etag(self):
+        """Правка записи и новый комментарий меняют ETag страниц."""
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        self.post.text = 'Новый текст'
+        self.post.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+        url = self.urls[-1]
+        etag = self.guest_client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.user, text='Да')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Да')
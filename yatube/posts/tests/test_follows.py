@@ -0,0 +1,106 @@
+from array import array
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from posts import follows, fragments
+from posts.models import AuthorStats, Follow
+
+User = get_user_model()
+
+
+class AdjacencyCacheTest(TestCase):
+    def test_evicts_by_total_ids(self):
+        """Вытесняются давно не читанные списки, пока id больше бюджета."""
+        graph = follows.AdjacencyCache(max_ids=10)
+        graph.put('followers', 1, 1, array('I', range(5)))
+        graph.put('followers', 2, 1, array('I', range(3)))
+        graph.get('followers', 1, 1)
+        graph.put('followers', 3, 1, array('I', range(3)))
+        self.assertIsNone(graph.get('followers', 2, 1))
+        self.assertIsNotNone(graph.get('followers', 1, 1))
+        self.assertLessEqual(graph.size, 10)
+
+    def test_change_applies_only_to_previous_generation(self):
+        graph = follows.AdjacencyCache(max_ids=100)
+        graph.put('followees', 1, 'a', array('I', [2, 9]))
+        graph.change('followees', 1, 'a', 'b', 4, True)
+        self.assertEqual(list(graph.get('followees', 1, 'b')), [2, 4, 9])
+        graph.change('followees', 1, 'x', 'c', 9, False)
+        self.assertIsNone(graph.get('followees', 1, 'c'))
+
+
+class FollowGraphTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+
+    def setUp(self):
+        cache.clear()
+        follows.graph().clear()
+
+    def test_concurrent_change_reloads_list(self):
+        """Если поколение одновременно сменил другой воркер, список
+        процесса не правится, а перечитывается из базы."""
+        follows.followees(self.reader.pk)
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.other)]
+        )
+        bump = fragments.bump_generation
+
+        def racing_bump(kind, pk):
+            current = bump(kind, pk)
+            bump(kind, pk)
+            return current
+
+        with mock.patch.object(fragments, 'bump_generation', racing_bump):
+            Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            list(follows.followees(self.reader.pk)),
+            sorted([self.author.pk, self.other.pk]),
+        )
+
+    def test_lists_follow_changes(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.other, author=self.author)
+        self.assertEqual(
+            list(follows.followers(self.author.pk)),
+            sorted([self.reader.pk, self.other.pk]),
+        )
+        self.assertEqual(follows.follower_count(self.author.pk), 2)
+        Follow.objects.filter(user=self.other).delete()
+        self.assertEqual(
+            list(follows.followers(self.author.pk)), [self.reader.pk]
+        )
+        self.assertEqual(list(follows.followees(self.other.pk)), [])
+
+    def test_mutual(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertFalse(follows.is_mutual(self.reader.pk, self.author.pk))
+        Follow.objects.create(user=self.author, author=self.reader)
+        self.assertTrue(follows.is_mutual(self.reader.pk, self.author.pk))
+
+    def test_warm_lookups_skip_follow_table(self):
+        """После загрузки списки правятся на месте, без запросов к Follow."""
+        follows.followees(self.reader.pk)
+        follows.followers(self.author.pk)
+        # Без строки счётчиков первая подписка посчитала бы их по таблицам.
+        AuthorStats.objects.create(author=self.author)
+        with CaptureQueriesContext(connection) as queries:
+            Follow.objects.create(user=self.reader, author=self.author)
+            self.assertTrue(follows.is_following(self.reader, self.author))
+            self.assertEqual(follows.follower_count(self.author.pk), 1)
+        # Задача досылки ленты читает саму подписку по id, это не список.
+        selects = [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'FROM "posts_follow"' in query['sql']
+            and 'WHERE "posts_follow"."id"' not in query['sql']
+        ]
+        self.assertEqual(selects, [])
@@ -1,7 +1,12 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import (
+    AuthorStats, Comment, Follow, Group, GroupAuthorStats, GroupStats, Post
+)
 
 User = get_user_model()
 
@@ -32,3 +37,151 @@ class PostModelTest(TestCase):
         group = PostModelTest.group
         expected_object_name = group.title
         self.assertEqual(expected_object_name, str(group))
+
+
+class AuthorStatsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def test_counters_follow_changes(self):
+        """Счётчики автора меняются при создании и удалении объектов."""
+        post = Post.objects.create(author=self.author, text='Запись')
+        comment = Comment.objects.create(
+            post=post, author=self.author, text='Комментарий'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        stats = AuthorStats.objects.get(author=self.author)
+        self.assertEqual(
+            (stats.post_count, stats.comment_count, stats.follower_count),
+            (1, 1, 1)
+        )
+        follow.delete()
+        comment.delete()
+        post.delete()
+        stats.refresh_from_db()
+        self.assertEqual(
+            (stats.post_count, stats.comment_count, stats.follower_count),
+            (0, 0, 0)
+        )
+
+    def test_rebuild_command(self):
+        """Команда пересчитывает счётчики после массовой загрузки."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Запись {i}') for i in range(3)
+        )
+        Follow.objects.bulk_create([
+            Follow(user=self.reader, author=self.author)
+        ])
+        call_command('rebuild_author_stats', stdout=StringIO())
+        stats = AuthorStats.objects.get(author=self.author)
+        self.assertEqual(stats.post_count, 3)
+        self.assertEqual(stats.follower_count, 1)
+        self.assertTrue(
+            AuthorStats.objects.filter(author=self.reader).exists()
+        )
+
+    def test_missing_row_created_from_tables(self):
+        """Строка без пересчёта создаётся с настоящими числами."""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f'Запись {i}') for i in range(3)
+        )
+        AuthorStats.objects.filter(author=self.author).delete()
+        Post.objects.create(author=self.author, text='Новая')
+        stats = AuthorStats.objects.get(author=self.author)
+        self.assertEqual(stats.post_count, 4)
+
+    def test_rebuild_command_many_authors(self):
+        """Пересчёт не упирается в ограничение SQLite в 500 строк."""
+        User.objects.bulk_create(
+            User(username=f'user{i}') for i in range(600)
+        )
+        call_command(
+            'rebuild_author_stats', batch_size=1000, stdout=StringIO()
+        )
+        self.assertEqual(AuthorStats.objects.count(), User.objects.count())
+
+
+class GroupStatsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.other = Group.objects.create(
+            title='Другая', slug='other', description='Описание'
+        )
+
+    def stats(self, group):
+        stats = GroupStats.objects.get(group=group)
+        return stats.post_count, stats.author_count, stats.last_post
+
+    def test_counters_follow_posts(self):
+        """Статистика группы меняется при создании, переносе и удалении."""
+        first = Post.objects.create(
+            author=self.author, group=self.group, text='Первая'
+        )
+        second = Post.objects.create(
+            author=self.reader, group=self.group, text='Вторая'
+        )
+        Post.objects.create(author=self.author, group=self.group, text='3')
+        self.assertEqual(self.stats(self.group)[:2], (3, 2))
+        second.group = self.other
+        second.save()
+        self.assertEqual(
+            self.stats(self.group)[:2], (2, 1)
+        )
+        self.assertEqual(
+            self.stats(self.other), (1, 1, second.pub_date)
+        )
+        second.delete()
+        self.assertEqual(self.stats(self.other), (0, 0, None))
+        first.delete()
+        self.assertEqual(self.stats(self.group)[:2], (1, 1))
+        self.assertEqual(
+            GroupAuthorStats.objects.get(group=self.group).post_count, 1
+        )
+
+    def test_last_post_recomputed_on_delete(self):
+        old = Post.objects.create(
+            author=self.author, group=self.group, text='Старая'
+        )
+        new = Post.objects.create(
+            author=self.author, group=self.group, text='Новая'
+        )
+        self.assertEqual(self.stats(self.group)[2], new.pub_date)
+        new.delete()
+        self.assertEqual(self.stats(self.group)[2], old.pub_date)
+
+    def test_rebuild_command(self):
+        """Команда пересчитывает статистику после массовой загрузки."""
+        Post.objects.bulk_create(
+            Post(author=author, group=self.group, text='Запись')
+            for author in (self.author, self.author, self.reader)
+        )
+        call_command('rebuild_group_stats', stdout=StringIO())
+        self.assertEqual(self.stats(self.group)[:2], (3, 2))
+        self.assertFalse(GroupStats.objects.filter(group=self.other).exists())
+        top = GroupAuthorStats.objects.filter(group=self.group).order_by(
+            '-post_count'
+        ).first()
+        self.assertEqual((top.author, top.post_count), (self.author, 2))
+
+    def test_rebuild_command_many_authors(self):
+        """Больше 500 строк за раз не упираются в ограничения SQLite."""
+        User.objects.bulk_create(
+            User(username=f'user{i}') for i in range(600)
+        )
+        Post.objects.bulk_create(
+            Post(author=author, group=self.group, text='Запись')
+            for author in User.objects.all()
+        )
+        call_command('rebuild_group_stats', stdout=StringIO())
+        self.assertEqual(
+            GroupAuthorStats.objects.count(), User.objects.count()
+        )
+        self.assertEqual(self.stats(self.group)[:2], (602, 602))
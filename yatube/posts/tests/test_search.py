@@ -0,0 +1,101 @@
+import base64
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-group',
+            description='Тестовое описание',
+        )
+        cls.rivers = [
+            Post.objects.create(
+                author=cls.user, group=cls.group, text=f'Реки Сибири {i}'
+            )
+            for i in range(12)
+        ]
+        cls.lake = Post.objects.create(
+            author=cls.other, text='Озеро Байкал и реки вокруг него'
+        )
+        cls.mountain = Post.objects.create(author=cls.other, text='Горы')
+
+    def setUp(self):
+        self.client = Client()
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при сохранении и удалении записи."""
+        self.assertEqual(search.search('горы')[0], [self.mountain.pk])
+        self.mountain.text = 'Холмы'
+        self.mountain.save()
+        self.assertEqual(search.search('горы')[0], [])
+        self.assertEqual(search.search('холмы')[0], [self.mountain.pk])
+        self.mountain.delete()
+        self.assertEqual(search.search('холмы')[0], [])
+
+    def test_filters_and_prefix(self):
+        """Фильтры по группе и автору, последнее слово — префикс."""
+        ids, _ = search.search('рек', author_id=self.other.pk)
+        self.assertEqual(ids, [self.lake.pk])
+        ids, _ = search.search('реки', group_id=self.group.pk, limit=20)
+        self.assertEqual(set(ids), {post.pk for post in self.rivers})
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 в запросе не ломают поиск."""
+        self.assertEqual(search.search('"горы* OR (NOT')[0], [])
+        self.assertEqual(search.search('  ')[0], [])
+
+    def test_search_view_pages(self):
+        """Страницы поиска по курсору не повторяют записи."""
+        url = reverse('posts:search')
+        first = self.client.get(url, {'q': 'реки'})
+        self.assertEqual(len(first.context['posts']), 10)
+        second = self.client.get('?'.join((url, first.context['next_query'])))
+        self.assertEqual(len(second.context['posts']), 3)
+        self.assertIsNone(second.context['next_query'])
+        found = first.context['posts'] + second.context['posts']
+        self.assertEqual(len(set(found)), 13)
+
+    def test_broken_cursor_shows_first_page(self):
+        """pk вне INTEGER и нечисловая оценка открывают первую страницу."""
+        url = reverse('posts:search')
+        for payload in (
+            f'[-1.5, {10 ** 30}]', '[-1.5, 1e400]', '[Infinity, 1]',
+            '[NaN, 1]',
+        ):
+            cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+            with self.subTest(payload=payload):
+                self.assertIsNone(search.decode_cursor(cursor))
+                response = self.client.get(
+                    url, {'q': 'реки', 'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['posts']), 10)
+
+    def test_rebuild_command(self):
+        """Команда восстанавливает индекс после bulk_create."""
+        Post.objects.bulk_create([Post(author=self.user, text='Пустыня')])
+        self.assertEqual(search.search('пустыня')[0], [])
+        call_command('rebuild_search_index', batch_size=5, stdout=StringIO())
+        self.assertEqual(len(search.search('пустыня')[0]), 1)
+
+    @override_settings(POSTS_SEARCH_BACKEND='posts.search.LikeBackend')
+    def test_like_backend(self):
+        """Запасной бэкенд ищет по тексту без индекса."""
+        ids, next_cursor = search.search('вокруг')
+        self.assertEqual(ids, [self.lake.pk])
+        self.assertIsNone(next_cursor)
@@ -0,0 +1,113 @@
+from xml.etree import ElementTree
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import http_date
+
+from posts.models import Group, Post
+
+User = get_user_model()
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+class SyndicationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Книги & <журналы>', slug='books', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Первая <запись>'
+        )
+        Post.objects.create(author=cls.author, text='Без группы')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def read(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        if response.streaming:
+            body = b''.join(response.streaming_content)
+        else:
+            body = response.content
+        return response, ElementTree.fromstring(body)
+
+    def test_rss_lists_group_posts(self):
+        url = reverse('posts:feed_group', args=['books', 'rss'])
+        response, root = self.read(url)
+        self.assertTrue(response.streaming)
+        self.assertIn('application/rss+xml', response['Content-Type'])
+        items = root.findall('channel/item')
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0].find('description').text, 'Первая <запись>')
+        self.assertEqual(items[0].find('category').text, 'Книги & <журналы>')
+        self.assertEqual(items[0].find('author').text, 'Лев Толстой')
+
+    def test_atom_lists_author_posts(self):
+        url = reverse('posts:feed_profile', args=['author', 'atom'])
+        _, root = self.read(url)
+        self.assertEqual(len(root.findall(f'{ATOM}entry')), 2)
+        self.assertIsNotNone(root.find(f'{ATOM}updated'))
+
+    def test_unknown_format(self):
+        url = reverse('posts:feed_index', args=['json'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_conditional_get(self):
+        url = reverse('posts:feed_index', args=['rss'])
+        response, _ = self.read(url)
+        self.assertEqual(
+            self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            ).status_code,
+            304,
+        )
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertEqual(
+            self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=http_date()
+            ).status_code,
+            200,
+        )
+
+    def test_cached_until_new_post(self):
+        """Повторный запрос отдаёт кэш, новая запись его сбрасывает."""
+        url = reverse('posts:feed_index', args=['rss'])
+        self.read(url)
+        with CaptureQueriesContext(connection) as queries:
+            response, _ = self.read(url)
+        self.assertFalse(response.streaming)
+        self.assertFalse(any(
+            'FROM "posts_post"' in query['sql'] and 'LIMIT 50' in query['sql']
+            for query in queries.captured_queries
+        ))
+        Post.objects.create(author=self.author, text='Свежая')
+        response, root = self.read(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(len(root.findall('channel/item')), 3)
+
+    def test_links_do_not_leak_between_requests(self):
+        """Кэш не отдаёт чужой хост и строку запроса первого читателя."""
+        url = reverse('posts:feed_index', args=['atom'])
+        response = self.client.get(f'{url}?utm=x', HTTP_HOST='localhost')
+        first = ElementTree.fromstring(b''.join(response.streaming_content))
+        self.assertEqual(
+            first.find(f'{ATOM}link[@rel="self"]').get('href'),
+            f'http://localhost{url}',
+        )
+        _, root = self.read(url)
+        self_link = root.find(f'{ATOM}link[@rel="self"]').get('href')
+        self.assertEqual(self_link, f'http://testserver{url}')
+        for entry in root.findall(f'{ATOM}entry'):
+            self.assertTrue(
+                entry.find(f'{ATOM}id').text.startswith('http://testserver/')
+            )
@@ -0,0 +1,149 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Post, PostThumbnail
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user,
+            text='Запись с картинкой',
+            image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        self.url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+
+    def card_variant(self):
+        return PostThumbnail.objects.get(
+            post=self.post,
+            geometry=thumbnails.CARD_GEOMETRY,
+            format=PostThumbnail.JPEG,
+        )
+
+    def test_variant_is_pending_until_built(self):
+        """До построения миниатюры показывается заглушка."""
+        variant = self.card_variant()
+        self.assertEqual(variant.status, PostThumbnail.PENDING)
+        self.assertEqual(variant.source, self.post.image.name)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Картинка обрабатывается')
+
+    def test_built_thumbnail_replaces_placeholder(self):
+        """Готовая миниатюра сразу появляется в ленте и на странице."""
+        self.client.get(reverse('posts:index'))
+        variant = self.card_variant()
+        thumbnails.generate(variant.pk)
+        variant.refresh_from_db()
+        self.assertEqual(variant.status, PostThumbnail.READY)
+        for url in (reverse('posts:index'), self.url):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, variant.url)
+                self.assertNotContains(response, 'Картинка обрабатывается')
+
+    def test_new_image_makes_variant_stale(self):
+        """Новая картинка снова переводит миниатюру в ожидание."""
+        variant = self.card_variant()
+        thumbnails.generate(variant.pk)
+        self.post.image = SimpleUploadedFile(
+            name='other.gif', content=SMALL_GIF, content_type='image/gif'
+        )
+        self.post.save()
+        variant.refresh_from_db()
+        self.assertEqual(variant.status, PostThumbnail.PENDING)
+        self.assertEqual(variant.source, self.post.image.name)
+
+    def test_text_edit_does_not_resubmit_variants(self):
+        """Правка текста не ставит миниатюры в пул, новая картинка ставит."""
+        run_now = mock.patch.object(
+            thumbnails.transaction, 'on_commit', side_effect=lambda f: f()
+        )
+        with mock.patch.object(thumbnails, 'submit') as submit, run_now:
+            self.post.text = 'Новый текст'
+            self.post.save()
+            submit.assert_not_called()
+            self.post.image = SimpleUploadedFile(
+                name='other.gif', content=SMALL_GIF,
+                content_type='image/gif',
+            )
+            self.post.save()
+        self.assertEqual(
+            submit.call_count,
+            PostThumbnail.objects.filter(post=self.post).count(),
+        )
+
+    def test_variants_rendered_as_lazy_srcset(self):
+        """Все ширины попадают в srcset, картинка грузится лениво."""
+        for variant in PostThumbnail.objects.filter(post=self.post):
+            thumbnails.generate(variant.pk)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'loading="lazy"')
+        for width in (320, 640, 960):
+            with self.subTest(width=width):
+                self.assertContains(response, f' {width}w')
+        # Исходник меньше карточки: вариант 1920 не увеличивается.
+        self.assertNotContains(response, ' 1920w')
+
+    @override_settings(POSTS_THUMBNAIL_WIDTHS=(320, 960))
+    def test_webp_variants_when_supported(self):
+        with mock.patch.object(thumbnails, 'supported', return_value=True):
+            specs = thumbnails.variant_specs()
+        self.assertEqual(specs[0], (thumbnails.CARD_GEOMETRY, 'JPEG'))
+        self.assertEqual(
+            sorted(specs),
+            [('320x113', 'JPEG'), ('320x113', 'WEBP'),
+             ('960x339', 'JPEG'), ('960x339', 'WEBP')],
+        )
+        with mock.patch.object(thumbnails, 'supported', return_value=False):
+            self.assertEqual(
+                [spec[1] for spec in thumbnails.variant_specs()],
+                ['JPEG'],
+            )
+
+    def test_warm_command_builds_all_variants(self):
+        """Команда строит миниатюры всех записей с картинками."""
+        PostThumbnail.objects.all().delete()
+        call_command('warm_thumbnails', workers=0, stdout=StringIO())
+        self.assertTrue(
+            PostThumbnail.objects.filter(
+                post=self.post, status=PostThumbnail.READY
+            ).exists()
+        )
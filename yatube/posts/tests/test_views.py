@@ -1,14 +1,23 @@
+import base64
 import shutil
 import tempfile
+from io import StringIO
+from unittest import mock
 
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
-from posts.models import Follow, Group, Post
+from django.utils import timezone
+from posts import comments
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
 from posts.forms import PostForm
+from posts.paginators import CursorPaginator
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -113,15 +122,28 @@ class PostPagesTests(TestCase):
         )
         response_1 = self.authorized_client.get(reverse('posts:index'))
         posts_1 = response_1.content
-        test_post.delete()
+        Post.objects.filter(pk=test_post.pk).update(text='Без сигналов')
         response_2 = self.authorized_client.get(reverse('posts:index'))
         posts_2 = response_2.content
         self.assertEqual(posts_2, posts_1)
-        cache.clear()
+        test_post.delete()
         response_3 = self.authorized_client.get(reverse('posts:index'))
         posts_3 = response_3.content
         self.assertNotEqual(posts_3, posts_1)
-        self.assertNotEqual(posts_3, posts_2)
+        self.assertNotIn('Новый пост для проверки кэша', posts_3.decode())
+
+    def test_feeds_read_denormalized_post_count(self):
+        """Ленты не считают записи автора для каждой карточки."""
+        for reverse_name in list(self.templates_pages_names)[:4]:
+            with self.subTest(reverse_name=reverse_name):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_client.get(reverse_name)
+                self.assertContains(response, 'Всего постов')
+                for query in queries.captured_queries:
+                    self.assertNotIn(
+                        'COUNT(*) AS "__count" FROM "posts_post"',
+                        query['sql']
+                    )
 
     def test_group_list_page_show_correct_post(self):
         response = self.authorized_client.get(
@@ -250,7 +272,65 @@ class PaginatorViewsTest(TestCase):
         )
         self.assertEqual(len(response.context['page_obj']), 3)
 
+    def test_cursor_pages_follow_each_other(self):
+        """Курсор ведёт на следующую страницу и обратно."""
+        url = reverse('posts:group_list', kwargs={'slug': 'test-group'})
+        first_page = self.client.get(url).context['page_obj']
+        next_cursor = first_page.paginator.next_cursor
+        self.assertIsNone(first_page.paginator.previous_cursor)
+        second_page = self.client.get(
+            url, {'cursor': next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertIsNone(second_page.paginator.next_cursor)
+        self.assertFalse(set(first_page) & set(second_page))
+        previous_page = self.client.get(
+            url, {'cursor': second_page.paginator.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(previous_page), list(first_page))
+
+    def test_cursor_page_is_single_query(self):
+        """Страница по курсору — один запрос без COUNT(*)."""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        with CaptureQueriesContext(connection) as queries:
+            page = paginator.get_page(None)
+            next_page = CursorPaginator(Post.objects.all(), 10).get_page(
+                paginator.next_cursor
+            )
+        self.assertEqual(len(page) + len(next_page), 13)
+        self.assertEqual(len(queries), 2)
+        for query in queries.captured_queries:
+            with self.subTest(sql=query['sql']):
+                self.assertNotIn('COUNT(', query['sql'])
+                self.assertNotIn('OFFSET', query['sql'])
+
+    def test_broken_cursor_shows_first_page(self):
+        """Некорректный курсор открывает первую страницу."""
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'test-group'}),
+            {'cursor': 'broken'}
+        )
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_out_of_range_cursor_shows_first_page(self):
+        """pk вне диапазона INTEGER в курсоре не роняет страницы."""
+        moment = timezone.now().isoformat()
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-group'}),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse('posts:api_index'),
+        )
+        for pk in ('1e400', str(10 ** 30)):
+            payload = f'["n", "{moment}", {pk}]'.encode()
+            cursor = base64.urlsafe_b64encode(payload).decode()
+            for url in urls:
+                with self.subTest(pk=pk, url=url):
+                    response = self.client.get(url, {'cursor': cursor})
+                    self.assertEqual(response.status_code, 200)
 
+
+@override_settings(JOBS_SYNC=True)
 class FollowTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -306,3 +386,257 @@ class FollowTests(TestCase):
         odjs = response.context['page_obj']
         self.assertIn(self.post1, odjs)
         self.assertNotIn(self.post, odjs)
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        """Новая запись попадает в материализованную ленту подписчика."""
+        Follow.objects.create(user=self.user, author=self.user1)
+        new_post = Post.objects.create(author=self.user1, text='Новая')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=new_post)
+            .exists()
+        )
+
+    def test_unfollow_removes_author_from_timeline(self):
+        """После отписки записи автора уходят из ленты."""
+        Follow.objects.create(user=self.user, author=self.user1)
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'auth1'})
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+
+    @override_settings(JOBS_SYNC=False)
+    def test_fan_out_waits_for_worker(self):
+        """Раскладка выполняется обработчиком очереди, а не в запросе."""
+        Follow.objects.create(user=self.user, author=self.user1)
+        Follow.objects.create(user=self.user1, author=self.user).delete()
+        new_post = Post.objects.create(author=self.user1, text='Новая')
+        self.assertFalse(TimelineEntry.objects.exists())
+        call_command('run_jobs', once=True, workers=1, stdout=StringIO())
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=new_post)
+            .exists()
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user1)
+                         .exists())
+
+    @override_settings(POSTS_FANOUT_LIMIT=1)
+    def test_popular_author_is_read_on_request(self):
+        """Записи популярного автора читаются в ленте без раскладки."""
+        Follow.objects.create(user=self.user, author=self.user1)
+        new_post = Post.objects.create(author=self.user1, text='Новая')
+        self.assertFalse(TimelineEntry.objects.exists())
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertIn(new_post, response.context['page_obj'])
+        self.assertIn(self.post1, response.context['page_obj'])
+
+    @override_settings(POSTS_FANOUT_LIMIT=2)
+    def test_follow_feed_pages_by_cursor(self):
+        """Страницы по курсору сливают ленту и записи популярных авторов."""
+        popular = User.objects.create_user(username='popular')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=self.user, author=self.user1)
+        Follow.objects.create(user=self.user, author=popular)
+        Follow.objects.create(user=reader, author=popular)
+        for number in range(12):
+            Post.objects.create(
+                author=(popular, self.user1)[number % 2],
+                text=f'Запись {number}',
+            )
+        expected = list(Post.objects.filter(
+            author__in=[popular, self.user1]
+        ).order_by('-pub_date', '-pk'))
+        url = reverse('posts:follow_index')
+        first = self.authorized_client.get(url).context['page_obj']
+        cursor = first.paginator.next_cursor
+        second = self.authorized_client.get(
+            url, {'cursor': cursor}
+        ).context['page_obj']
+        self.assertEqual([*first, *second], expected)
+        self.assertIsNone(second.paginator.next_cursor)
+        back = self.authorized_client.get(
+            url, {'cursor': second.paginator.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back), list(first))
+
+    def test_follow_feed_cursor_page_queries(self):
+        """Страница по курсору не строит запрос всей ленты."""
+        Follow.objects.create(user=self.user, author=self.user1)
+        for number in range(12):
+            Post.objects.create(author=self.user1, text=f'Запись {number}')
+        url = reverse('posts:follow_index')
+        cursor = self.authorized_client.get(url).context[
+            'page_obj'
+        ].paginator.next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url, {'cursor': cursor})
+        popular = [
+            query for query in queries.captured_queries
+            if '"follower_count" >=' in query['sql']
+        ]
+        # Сессия, пользователь, популярные авторы, ключи ленты, записи
+        # страницы и их миниатюры.
+        self.assertEqual(len(popular), 1)
+        self.assertEqual(len(queries), 6)
+
+    @override_settings(POSTS_TIMELINE_LENGTH=2, POSTS_TIMELINE_TRIM_EVERY=1)
+    def test_fan_out_trims_timeline(self):
+        """Раскладка подрезает ленту до POSTS_TIMELINE_LENGTH записей."""
+        Follow.objects.create(user=self.user, author=self.user1)
+        for number in range(4):
+            Post.objects.create(author=self.user1, text=f'Запись {number}')
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 2
+        )
+
+    @override_settings(POSTS_FANOUT_LIMIT=2)
+    def test_author_below_limit_is_backfilled(self):
+        """Записи, сделанные автором в популярности, досылаются в ленты."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=self.user, author=self.user1)
+        Follow.objects.create(user=reader, author=self.user1)
+        new_post = Post.objects.create(author=self.user1, text='Новая')
+        self.assertFalse(TimelineEntry.objects.filter(post=new_post).exists())
+        Follow.objects.filter(user=reader).delete()
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=new_post)
+            .exists()
+        )
+
+    def test_profile_following_is_viewer_specific(self):
+        """Кнопка профиля зависит от подписки зрителя, а не от чужих."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.user1)
+        url = reverse('posts:profile', kwargs={'username': 'auth1'})
+        response = self.authorized_client.get(url)
+        self.assertFalse(response.context['following'])
+        Follow.objects.create(user=self.user, author=self.user1)
+        response = self.authorized_client.get(url)
+        self.assertTrue(response.context['following'])
+
+    def test_cards_show_follow_state(self):
+        """Состояние подписки на карточках не стоит запроса на автора."""
+        url = reverse('posts:index')
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.context['followed'], set())
+        self.authorized_client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'auth1'})
+        )
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.context['followed'], {self.user1.pk})
+        self.assertContains(response, 'Отписаться', count=1)
+        authors = [
+            User.objects.create_user(username=f'author{i}') for i in range(3)
+        ]
+        for author in authors:
+            Post.objects.create(author=author, text='Ещё запись')
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(url)
+        follow_queries = [
+            query for query in queries.captured_queries
+            if 'posts_follow' in query['sql']
+        ]
+        self.assertEqual(len(follow_queries), 1)
+
+
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Тестовая')
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f'Комментарий {i}')
+            for i in range(25)
+        )
+
+    def setUp(self):
+        self.client = Client()
+        cache.clear()
+
+    def test_post_detail_shows_first_comments(self):
+        """На странице записи первая страница комментариев и их число."""
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), 20)
+        self.assertEqual(response.context['comment_count'], 25)
+        self.assertIsNotNone(comments.paginator.next_cursor)
+
+    def test_comments_endpoint_loads_more(self):
+        """JSON-эндпоинт отдаёт следующую порцию комментариев."""
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        first = self.client.get(url).json()
+        second = self.client.get(url, {'cursor': first['next_cursor']}).json()
+        self.assertEqual(len(first['comments']), 20)
+        self.assertEqual(len(second['comments']), 5)
+        self.assertIsNone(second['next_cursor'])
+        ids = [c['id'] for c in first['comments'] + second['comments']]
+        self.assertEqual(len(set(ids)), 25)
+        self.assertEqual(first['comments'][0]['author'], 'auth')
+
+    def test_comments_do_not_query_authors(self):
+        """Авторы комментариев загружаются вместе с комментариями."""
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertEqual(len(queries), 2)
+
+    def test_comment_count_follows_signals(self):
+        """Кэшированное число комментариев меняется при создании и удалении."""
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Ещё'
+        )
+        self.assertEqual(self.client.get(url).json()['count'], 26)
+        comment.delete()
+        self.assertEqual(self.client.get(url).json()['count'], 25)
+
+    def test_comment_count_expires(self):
+        """Число комментариев хранится не дольше COUNT_TIMEOUT."""
+        with mock.patch.object(
+            comments.cache, 'set', wraps=comments.cache.set
+        ) as cache_set:
+            comments.comment_count(self.post.pk)
+        (key, count, timeout), _ = cache_set.call_args
+        self.assertEqual((count, timeout), (25, comments.COUNT_TIMEOUT))
+
+
+class GroupIndexTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.quiet = Group.objects.create(
+            title='Тихая', slug='quiet', description='Описание'
+        )
+        cls.busy = Group.objects.create(
+            title='Активная', slug='busy', description='Описание'
+        )
+        cls.empty = Group.objects.create(
+            title='Пустая', slug='empty', description='Описание'
+        )
+        Post.objects.create(author=cls.user, group=cls.quiet, text='Раньше')
+        Post.objects.create(author=cls.user, group=cls.busy, text='Позже')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_groups_ordered_by_activity(self):
+        response = self.client.get(reverse('posts:group_index'))
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.busy, self.quiet, self.empty],
+        )
+
+    def test_group_page_shows_stats(self):
+        response = self.client.get(
+            reverse('posts:group_list', kwargs={'slug': 'busy'})
+        )
+        self.assertContains(response, 'Авторов: 1')
+        self.assertEqual(
+            [row.author for row in response.context['top_authors']],
+            [self.user],
+        )
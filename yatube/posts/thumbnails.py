@@ -0,0 +1,220 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import features
+from sorl.thumbnail import get_thumbnail
+
+from .models import PostThumbnail
+
+CARD_WIDTH, CARD_HEIGHT = 960, 339
+CARD_GEOMETRY = f'{CARD_WIDTH}x{CARD_HEIGHT}'
+CARD_OPTIONS = {'crop': 'center'}
+# Карточка занимает всю ширину экрана телефона и не шире CARD_WIDTH.
+CARD_SIZES = f'(max-width: {CARD_WIDTH}px) 100vw, {CARD_WIDTH}px'
+MIME_TYPES = {
+    PostThumbnail.JPEG: 'image/jpeg',
+    PostThumbnail.WEBP: 'image/webp',
+}
+
+logger = logging.getLogger(__name__)
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def nominal_width(variant):
+    return int(variant.geometry.split('x')[0])
+
+
+def generate(variant_id):
+    """Строит миниатюру и сохраняет результат в записи варианта."""
+    variant = PostThumbnail.objects.select_related('post').filter(
+        pk=variant_id
+    ).first()
+    if variant is None or variant.source != variant.post.image.name:
+        return
+    try:
+        # Крупнее карточки не увеличиваем: такие варианты нужны только
+        # для экранов с высокой плотностью и больших исходников.
+        thumbnail = get_thumbnail(
+            variant.post.image,
+            variant.geometry,
+            format=variant.format,
+            upscale=nominal_width(variant) <= CARD_WIDTH,
+            **CARD_OPTIONS,
+        )
+        # Для нечитаемого файла sorl не бросает исключение, а отдаёт
+        # миниатюру без размеров: обращение к ним падает здесь.
+        size = thumbnail.width, thumbnail.height
+    except Exception:
+        logger.exception('Не удалось построить миниатюру %s', variant)
+        variant.status = PostThumbnail.FAILED
+    else:
+        variant.url = thumbnail.url
+        variant.width, variant.height = size
+        variant.status = PostThumbnail.READY
+    variant.save()
+
+
+def generate_in_pool(variant_id):
+    try:
+        generate(variant_id)
+    finally:
+        connection.close()
+
+
+def submit(variant_id):
+    if settings.POSTS_THUMBNAILS_SYNC:
+        generate(variant_id)
+    else:
+        executor().submit(generate_in_pool, variant_id)
+
+
+@lru_cache(maxsize=None)
+def supported(image_format):
+    if image_format == PostThumbnail.WEBP:
+        return features.check('webp')
+    return True
+
+
+def variant_specs():
+    """Пары (геометрия, формат) вариантов: карточка для src идёт первой."""
+    formats = [
+        image_format for image_format in settings.POSTS_THUMBNAIL_FORMATS
+        if supported(image_format)
+    ]
+    geometries = [
+        f'{width}x{round(width * CARD_HEIGHT / CARD_WIDTH)}'
+        for width in settings.POSTS_THUMBNAIL_WIDTHS
+    ]
+    specs = [
+        (geometry, image_format)
+        for image_format in formats for geometry in geometries
+    ]
+    card = (CARD_GEOMETRY, PostThumbnail.JPEG)
+    return [card] + [spec for spec in specs if spec != card]
+
+
+def ensure_variants(post, force=False, retry=True):
+    """Заводит варианты миниатюр записи; возвращает id тех, что строить.
+
+    Варианты читаются и заводятся пачкой, а не по запросу на каждый.
+    retry — строить заново и неготовые варианты той же картинки: так их
+    добирает warm_thumbnails. При сохранении записи они уже в очереди,
+    и строятся только новые варианты и варианты сменившейся картинки.
+    """
+    variants = PostThumbnail.objects.filter(post=post)
+    if not post.image:
+        variants.delete()
+        return []
+    specs = variant_specs()
+    existing = {
+        (variant.geometry, variant.format): variant for variant in variants
+    }
+    extra = [
+        variant.pk for spec, variant in existing.items() if spec not in specs
+    ]
+    if extra:
+        PostThumbnail.objects.filter(pk__in=extra).delete()
+    PostThumbnail.objects.bulk_create(
+        [
+            PostThumbnail(
+                post=post,
+                geometry=geometry,
+                format=image_format,
+                source=post.image.name,
+            )
+            for geometry, image_format in specs
+            if (geometry, image_format) not in existing
+        ],
+        ignore_conflicts=True,
+    )
+    outdated = {
+        spec: variant.pk for spec, variant in existing.items()
+        if spec in specs and (
+            force
+            or variant.source != post.image.name
+            or retry and variant.status != variant.READY
+        )
+    }
+    if outdated:
+        PostThumbnail.objects.filter(pk__in=outdated.values()).update(
+            source=post.image.name,
+            status=PostThumbnail.PENDING,
+            url='',
+            updated=timezone.now(),
+        )
+    pending = {
+        (variant.geometry, variant.format): variant.pk
+        for variant in variants.filter(status=PostThumbnail.PENDING)
+    }
+    return [
+        pending[spec] for spec in specs
+        if spec in pending
+        and (retry or spec in outdated or spec not in existing)
+    ]
+
+
+def schedule(post):
+    """Ставит построение миниатюр записи в пул после фиксации транзакции.
+
+    Правка текста записи миниатюры не трогает и в пул их не ставит.
+    """
+    for variant_id in ensure_variants(post, retry=False):
+        transaction.on_commit(lambda pk=variant_id: submit(pk))
+
+
+def is_card(variant):
+    return (
+        variant.geometry == CARD_GEOMETRY
+        and variant.format == PostThumbnail.JPEG
+    )
+
+
+def card_thumbnail(post):
+    """Готовая миниатюра карточки из предзагруженных вариантов."""
+    for variant in post.thumbnails.all():
+        if is_card(variant) and variant.status == variant.READY:
+            return variant
+    return None
+
+
+def srcset(variants):
+    """srcset из готовых вариантов; одинаковые по ширине не повторяются."""
+    widths = {}
+    for variant in variants:
+        widths.setdefault(variant.width, variant.url)
+    return ', '.join(
+        f'{url} {width}w' for width, url in sorted(widths.items())
+    )
+
+
+def card_sources(post):
+    """srcset по форматам из предзагруженных вариантов записи.
+
+    Варианты крупнее карточки из маленького исходника не увеличиваются
+    и выходят не шире карточки; они ничего не добавляют и пропускаются.
+    """
+    ready = {}
+    for variant in sorted(post.thumbnails.all(), key=nominal_width):
+        if variant.status != variant.READY or not variant.width:
+            continue
+        if nominal_width(variant) > CARD_WIDTH >= variant.width:
+            continue
+        ready.setdefault(variant.format, []).append(variant)
+    return {
+        image_format: srcset(variants)
+        for image_format, variants in ready.items()
+    }
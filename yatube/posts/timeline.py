@@ -0,0 +1,164 @@
+import random
+
+from django.conf import settings
+from django.db.models import Q
+
+from . import follows, fragments
+from .models import AuthorStats, Post, TimelineEntry
+from .paginators import NEXT, CursorPaginator, decode_cursor
+
+
+def popular_authors():
+    """Авторы, чьи записи не раскладываются по лентам, а читаются на лету."""
+    return AuthorStats.objects.filter(
+        follower_count__gte=settings.POSTS_FANOUT_LIMIT
+    ).values_list('author_id', flat=True)
+
+
+def is_popular(author_id):
+    return popular_authors().filter(author_id=author_id).exists()
+
+
+def followed_popular(user_id):
+    followed = follows.followees(user_id)
+    return [
+        author_id for author_id in popular_authors()
+        if follows.contains(followed, author_id)
+    ]
+
+
+def generation():
+    """Поколение лент подписок: меняется при каждой правке TimelineEntry."""
+    value, = fragments.get_generations(
+        [fragments.generation_key('timeline', 'all')]
+    )
+    return value
+
+
+def changed():
+    fragments.bump_generation('timeline', 'all')
+
+
+def fan_out(post):
+    """Раскладывает новую запись по лентам подписчиков автора.
+
+    Ленты подрезаются не при каждой записи, а в среднем раз в
+    POSTS_TIMELINE_TRIM_EVERY, чтобы не читать их все на каждую запись.
+    """
+    if is_popular(post.author_id):
+        return
+    followers = follows.followers(post.author_id)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers
+        ),
+        ignore_conflicts=True,
+    )
+    for user_id in followers:
+        if random.random() * settings.POSTS_TIMELINE_TRIM_EVERY < 1:
+            trim(user_id)
+    changed()
+
+
+def trim(user_id):
+    """Оставляет в ленте не больше POSTS_TIMELINE_LENGTH свежих записей."""
+    stale = TimelineEntry.objects.filter(user_id=user_id).order_by(
+        '-pub_date', '-post_id'
+    ).values_list('pk', flat=True)[settings.POSTS_TIMELINE_LENGTH:]
+    TimelineEntry.objects.filter(pk__in=list(stale)).delete()
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту свежие записи автора после подписки."""
+    if is_popular(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date'
+    ).values_list('pk', 'pub_date')[:settings.POSTS_TIMELINE_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ),
+        ignore_conflicts=True,
+    )
+    trim(user_id)
+    changed()
+
+
+def backfill_followers(author_id):
+    """Записи автора, который перестал быть популярным, во всех лентах.
+
+    Пока автор был популярным, его записи не раскладывались, а подписки
+    не досылались.
+    """
+    for user_id in follows.followers(author_id):
+        backfill(user_id, author_id)
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты записи автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+    changed()
+
+
+def feed(user):
+    """Все записи ленты подписок: для номерных страниц ?page=N.
+
+    Страницы по курсору читает TimelinePaginator.
+    """
+    entries = TimelineEntry.objects.filter(user=user).values('post')
+    popular = followed_popular(user.pk)
+    if not popular:
+        return Post.objects.filter(pk__in=entries)
+    return Post.objects.filter(Q(pk__in=entries) | Q(author__in=popular))
+
+
+class TimelinePaginator(CursorPaginator):
+    """Лента подписок по ключу (pub_date, post_id) прямо по TimelineEntry.
+
+    Ключи страницы читаются по индексу (user, -pub_date, -post), а записи
+    популярных авторов — по индексу автора, не больше per_page + 1 на
+    каждого. Ключи сливаются в памяти, а Post из object_list читается
+    только для строк страницы.
+    """
+
+    def __init__(self, object_list, per_page, user):
+        super().__init__(object_list, per_page)
+        self.user = user
+
+    def key_querysets(self, cursor):
+        """Запросы (pub_date, id записи): лента и популярные авторы."""
+        sources = [(
+            TimelineEntry.objects.filter(user=self.user).order_by(
+                '-pub_date', '-post_id'
+            ).values_list('pub_date', 'post_id'),
+            'post_id',
+        )]
+        for author_id in followed_popular(self.user.pk):
+            sources.append((
+                Post.objects.filter(author_id=author_id).order_by(
+                    '-pub_date', '-pk'
+                ).values_list('pub_date', 'pk'),
+                'pk',
+            ))
+        position = decode_cursor(cursor)
+        if position is not None:
+            sources = [
+                (self.seek(queryset, position, key), key)
+                for queryset, key in sources
+            ]
+        return [queryset[:self.per_page + 1] for queryset, _ in sources]
+
+    def page_rows(self, cursor):
+        position = decode_cursor(cursor)
+        direction = NEXT if position is None else position[0]
+        keys = set()
+        for queryset in self.key_querysets(cursor):
+            keys.update(queryset)
+        keys = sorted(keys, reverse=direction == NEXT)[:self.per_page + 1]
+        posts = self.object_list.in_bulk([pk for _, pk in keys])
+        return direction, [posts[pk] for _, pk in keys if pk in posts]
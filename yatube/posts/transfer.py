@@ -0,0 +1,257 @@
+import csv
+import json
+import os
+from collections import Counter
+from io import StringIO
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import DateTimeField, Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, ImportedId, Post, User
+
+# Колонки файла и поля, из которых они выгружаются. id в разных
+# окружениях не совпадают, поэтому пользователи передаются по username,
+# а группы по slug. У записей и комментариев естественного ключа нет:
+# они получают новые id, а соответствие id источника запоминается
+# в ImportedId, по нему переводятся ссылки комментариев на записи.
+SPECS = {
+    'group': (Group, {
+        'id': 'id',
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+    }),
+    'post': (Post, {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+    }),
+    'comment': (Comment, {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }),
+    'follow': (Follow, {
+        'id': 'id',
+        'user': 'user__username',
+        'author': 'author__username',
+    }),
+}
+FORMATS = ('jsonl', 'csv')
+NATURAL_KEYS = {
+    '__username': (User, 'username'),
+    '__slug': (Group, 'slug'),
+}
+REMAPPED = {'post': Post, 'comment': Comment}
+
+
+def guess_format(path):
+    return 'csv' if path.endswith('.csv') else 'jsonl'
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_checkpoint(path, name):
+    """Позиция, на которой остановился прошлый запуск, или 0."""
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as checkpoint:
+        data = json.load(checkpoint)
+    return data['position'] if data.get('model') == name else 0
+
+
+def write_checkpoint(path, name, position):
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as checkpoint:
+        json.dump({'model': name, 'position': position}, checkpoint)
+    os.replace(temporary, path)
+
+
+def export_rows(name, after=0, chunk_size=2000, queryset=None):
+    """Строки модели по возрастанию id без загрузки таблицы в память."""
+    model, columns = SPECS[name]
+    if queryset is None:
+        queryset = model.objects.all()
+    rows = queryset.filter(pk__gt=after).order_by('pk').values_list(
+        *columns.values()
+    )
+    for values in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(columns, values))
+
+
+def encode(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def format_row(row, file_format, columns):
+    """Строка файла для записи, включая перевод строки."""
+    row = {key: encode(value) for key, value in row.items()}
+    if file_format == 'jsonl':
+        return json.dumps(row, ensure_ascii=False) + '\n'
+    line = StringIO()
+    csv.DictWriter(line, columns).writerow(row)
+    return line.getvalue()
+
+
+def csv_header(columns):
+    line = StringIO()
+    csv.DictWriter(line, columns).writeheader()
+    return line.getvalue()
+
+
+def read_rows(lines, file_format):
+    """Словари строк файла; пустые значения CSV становятся None."""
+    if file_format == 'jsonl':
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+        return
+    for row in csv.DictReader(lines):
+        yield {key: value if value != '' else None
+               for key, value in row.items()}
+
+
+def imported_ids(name, source_ids):
+    """Новые id ещё существующих объектов по id источника."""
+    model = REMAPPED[name]
+    return dict(
+        ImportedId.objects.filter(
+            model=name,
+            source_id__in=source_ids,
+            object_id__in=model.objects.values('pk'),
+        ).values_list('source_id', 'object_id')
+    )
+
+
+def related_ids(name, rows):
+    """id связанных объектов пачки: {колонка: {значение из файла: id}}."""
+    columns = SPECS[name][1]
+    ids = {}
+    for column, lookup in columns.items():
+        values = {row[column] for row in rows if row.get(column) is not None}
+        for suffix, (model, key) in NATURAL_KEYS.items():
+            if lookup.endswith(suffix):
+                ids[column] = dict(
+                    model.objects.filter(
+                        **{f'{key}__in': values}
+                    ).values_list(key, 'pk')
+                )
+        if column in REMAPPED and lookup == f'{column}_id':
+            ids[column] = imported_ids(column, {int(v) for v in values})
+    return ids
+
+
+def convert(field, value):
+    if isinstance(field, DateTimeField):
+        return parse_datetime(value) if value else timezone.now()
+    if value is None and field.empty_strings_allowed:
+        return ''
+    return value
+
+
+def build_objects(name, rows):
+    """Объекты модели для bulk_create, их id в источнике и пропуски.
+
+    Строка пропускается, если она уже загружена или ссылается на объект,
+    которого нет в базе. Пропуски считаются по колонкам в Counter:
+    колонка 'id' — уже загруженные строки.
+    """
+    model, columns = SPECS[name]
+    related = related_ids(name, rows)
+    loaded = set()
+    if name in REMAPPED:
+        loaded = set(ImportedId.objects.filter(
+            model=name, source_id__in={int(row['id']) for row in rows}
+        ).values_list('source_id', flat=True))
+    objects, sources, skipped = [], [], Counter()
+    for row in rows:
+        if loaded and int(row['id']) in loaded:
+            skipped['id'] += 1
+            continue
+        values = {}
+        for column in columns:
+            if column == 'id':
+                continue
+            value = row.get(column)
+            field = model._meta.get_field(column)
+            if column in related and value is not None:
+                value = related[column].get(
+                    int(value) if column in REMAPPED else value
+                )
+                if value is None:
+                    skipped[column] += 1
+                    break
+            if field.is_relation:
+                values[field.attname] = value
+            else:
+                values[column] = convert(field, value)
+        else:
+            objects.append(model(**values))
+            sources.append(row.get('id'))
+    return objects, sources, skipped
+
+
+def import_batch(name, rows):
+    """Загружает пачку строк в текущей транзакции; возвращает пропуски.
+
+    Записи и комментарии получают id подряд за последним в таблице, чтобы
+    сохранить соответствие в ImportedId: bulk_create в SQLite новых id не
+    возвращает. Конфликты для них не игнорируются: если id успел занять
+    другой процесс, пачка откатывается целиком, а не получает чужие
+    соответствия. auto_now_add ставит текущее время при вставке, поэтому
+    даты из файла записываются следом через bulk_update.
+    """
+    model = SPECS[name][0]
+    objects, sources, skipped = build_objects(name, rows)
+    dates = [
+        field.name for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    values = [[getattr(obj, field) for field in dates] for obj in objects]
+    if name in REMAPPED:
+        last = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        for pk, obj in enumerate(objects, last + 1):
+            obj.pk = pk
+        # id удалённых объектов могут выдаваться заново: старые
+        # соответствия с ними указывали бы на новые строки.
+        ImportedId.objects.filter(
+            model=name, object_id__gt=last
+        ).delete()
+        model.objects.bulk_create(objects)
+    else:
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+    if name in REMAPPED:
+        ImportedId.objects.bulk_create(
+            ImportedId(model=name, source_id=source, object_id=obj.pk)
+            for source, obj in zip(sources, objects)
+        )
+    if dates and objects:
+        for obj, row in zip(objects, values):
+            for field, value in zip(dates, row):
+                setattr(obj, field, value)
+        model.objects.bulk_update(objects, dates)
+    return skipped
+
+
+def reset_sequences(model):
+    """Сдвигает автоинкремент за импортированные id (нужно не для SQLite)."""
+    statements = connection.ops.sequence_reset_sql(no_style(), [model])
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
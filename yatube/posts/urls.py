@@ -1,16 +1,23 @@
 from django.urls import path
 
-from . import views
+from . import api, syndication, views
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('groups/', views.group_index, name='group_index'),
     path('group/<slug:slug>/', views.group_post, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('search/', views.post_search, name='search'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path(
         'posts/<int:post_id>/comment/',
         views.add_comment,
@@ -27,4 +34,24 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path('feed/<str:fmt>/', syndication.index, name='feed_index'),
+    path(
+        'group/<slug:slug>/feed/<str:fmt>/',
+        syndication.group,
+        name='feed_group'
+    ),
+    path(
+        'profile/<str:username>/feed/<str:fmt>/',
+        syndication.profile,
+        name='feed_profile'
+    ),
+    path('api/posts/', api.index, name='api_index'),
+    path('api/group/<slug:slug>/', api.group_posts, name='api_group'),
+    path(
+        'api/profile/<str:username>/',
+        api.profile_posts,
+        name='api_profile'
+    ),
+    path('api/posts/<int:post_id>/', api.post_detail, name='api_post'),
+    path('api/follow/', api.follow_posts, name='api_follow'),
 ]
@@ -1,67 +1,159 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
-from django.views.decorators.cache import cache_page
+from django.db.models import F
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.db import replica_reads
+
+from . import feeds, follows, group_stats, search
+from .comments import comment_count, serialize
+from .conditional import (
+    conditional_page, group_etag, index_etag, post_etag, profile_etag
+)
 from .forms import PostForm, CommentForm
 from .models import Follow, Group, Post, User
+from .page_cache import cached_page, group_scope, index_scope, profile_scope
+from .paginators import CommentPaginator, CursorPaginator
+from .timeline import TimelinePaginator
 
 PAGE_PER_PAGE = 10
+GROUPS_PER_PAGE = 30
+COMMENTS_PER_PAGE = 20
 
 
 def paging(request, query, obj_per_page):
-    paginator = Paginator(query, obj_per_page)
+    """Страница по ?cursor=, старые ссылки ?page=N обслуживаются как раньше."""
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    if page_number is not None:
+        return Paginator(query, obj_per_page).get_page(page_number)
+    paginator = CursorPaginator(query, obj_per_page)
+    return paginator.get_page(request.GET.get('cursor'))
 
 
-@cache_page(20, key_prefix='index_page')
+@replica_reads
+@conditional_page(index_etag)
+@cached_page(index_scope)
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.select_related('author', 'group')
+    post_list = feeds.index_posts()
     page_obj = paging(request, post_list, PAGE_PER_PAGE)
     context = {
         'page_obj': page_obj,
+        'followed': follows.page_followed(request.user, page_obj),
     }
     return render(request, template, context)
 
 
+@replica_reads
+@conditional_page(group_etag)
+@cached_page(group_scope)
 def group_post(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
+    group = get_object_or_404(
+        Group.objects.select_related('stats'), slug=slug
+    )
+    post_list = feeds.group_posts(group)
     page_obj = paging(request, post_list, PAGE_PER_PAGE)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'followed': follows.page_followed(request.user, page_obj),
+        'top_authors': group_stats.top_authors(group),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
+def group_index(request):
+    """Группы по свежести последней записи, без подсчёта записей."""
+    groups = Group.objects.select_related('stats').order_by(
+        F('stats__last_post').desc(nulls_last=True), 'title'
+    )
+    context = {
+        'page_obj': Paginator(groups, GROUPS_PER_PAGE).get_page(
+            request.GET.get('page')
+        ),
+    }
+    return render(request, 'posts/group_index.html', context)
+
+
+@replica_reads
+@conditional_page(profile_etag)
+@cached_page(profile_scope)
 def profile(request, username):
-    post_author = get_object_or_404(User, username=username)
-    post_list = post_author.posts.all()
+    post_author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    post_list = feeds.profile_posts(post_author)
     page_obj = paging(request, post_list, PAGE_PER_PAGE)
-    me = request.user
-    following = me.is_authenticated and post_author.following.exists()
     context = {
         'post_author': post_author,
         'page_obj': page_obj,
-        'following': following,
+        'following': follows.is_following(request.user, post_author),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@replica_reads
+@conditional_page(post_etag)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(feeds.post_detail(post_id))
+    paginator = CommentPaginator(feeds.post_comments(post), COMMENTS_PER_PAGE)
     context = {
         'post': post,
         'form': CommentForm(),
-        'comments': comments,
+        'comments': paginator.get_page(request.GET.get('comments')),
+        'comment_count': comment_count(post.pk),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@replica_reads
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    paginator = CommentPaginator(feeds.post_comments(post), COMMENTS_PER_PAGE)
+    page = paginator.get_page(request.GET.get('cursor'))
+    return JsonResponse({
+        'count': comment_count(post.pk),
+        'comments': [serialize(comment) for comment in page],
+        'next_cursor': paginator.next_cursor,
+        'previous_cursor': paginator.previous_cursor,
+    })
+
+
+@replica_reads
+def post_search(request):
+    """Поиск по тексту записей с фильтрами ?group= и ?author=."""
+    query = request.GET.get('q', '')
+    group = author = None
+    if request.GET.get('group'):
+        group = get_object_or_404(Group, slug=request.GET['group'])
+    if request.GET.get('author'):
+        author = get_object_or_404(User, username=request.GET['author'])
+    ids, next_cursor = search.search(
+        query,
+        group_id=group and group.pk,
+        author_id=author and author.pk,
+        cursor=request.GET.get('cursor'),
+        limit=PAGE_PER_PAGE,
+    )
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_query = params.urlencode()
+    posts = feeds.posts_by_ids(ids)
+    context = {
+        'query': query,
+        'group': group,
+        'search_author': author,
+        'posts': posts,
+        'next_query': next_query,
+        'followed': follows.page_followed(request.user, posts),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     if request.method != 'POST':
@@ -116,12 +208,20 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@replica_reads
 @login_required
 def follow_index(request):
-    follow = request.user.follower.all()
-    follow_list = User.objects.filter(following__in=follow)
-    posts = Post.objects.filter(author__in=(follow_list))
-    page_obj = paging(request, posts, PAGE_PER_PAGE)
+    # Запрос всей ленты нужен только старым ссылкам ?page=N: страницы
+    # по курсору TimelinePaginator читает сам.
+    if request.GET.get('page') is not None:
+        page_obj = paging(
+            request, feeds.follow_posts(request.user), PAGE_PER_PAGE
+        )
+    else:
+        paginator = TimelinePaginator(
+            feeds.index_posts(), PAGE_PER_PAGE, request.user
+        )
+        page_obj = paginator.get_page(request.GET.get('cursor'))
     context = {
         'page_obj': page_obj,
     }
@@ -50,7 +50,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.MetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -80,17 +82,64 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# Потоки для запросов при запуске через yatube.asgi: чтения и записи
+# выполняются в отдельных пулах.
+ASGI_READ_THREADS = 16
+ASGI_WRITE_THREADS = 2
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+CONN_MAX_AGE = int(os.getenv('YATUBE_CONN_MAX_AGE', 60))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
     }
 }
 
+# Реплики только для чтения, например
+# YATUBE_REPLICAS=db_replica1.sqlite3,db_replica2.sqlite3. Локально это
+# копии основной базы, которые обновляет команда sync_replicas.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.getenv('YATUBE_REPLICAS', '').split(',')), start=1
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, name),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+
+DATABASE_ROUTERS = ['core.db.ReplicaRouter']
+
+# PRAGMA для каждого нового соединения SQLite: с WAL читатели не ждут
+# писателя, а busy_timeout заставляет писателя ждать блокировку вместо
+# ошибки «database is locked». YATUBE_SQLITE_TUNING=0 оставляет
+# настройки SQLite по умолчанию.
+SQLITE_PRAGMAS = {}
+if os.getenv('YATUBE_SQLITE_TUNING', '1') == '1':
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -20000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY',
+    }
+
+# Сколько секунд после записи клиент читает только из default.
+REPLICA_STICKY_COOKIE = 'primary_reads'
+REPLICA_STICKY_SECONDS = 10
+# Сколько живут в кэше страницы и карточки, построенные по чтениям с
+# реплики: реплика может отставать, и устаревшее не должно жить дольше.
+REPLICA_CACHE_TIMEOUT = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -147,8 +196,88 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
-CACHES = {
-    'default': {
+# Общий для воркеров кэш выбирается переменной окружения YATUBE_CACHE:
+# locmem (по умолчанию, только для одного процесса), file или db (таблица
+# в базе, нужен manage.py createcachetable). По умолчанию Django чистит
+# кэш уже после 300 записей и вытесняет поколения вместе со страницами.
+CACHE_MODE = os.getenv('YATUBE_CACHE', 'locmem')
+CACHE_OPTIONS = {'MAX_ENTRIES': 50000}
+SHARED_CACHES = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'OPTIONS': CACHE_OPTIONS,
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv(
+            'YATUBE_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')
+        ),
+        'OPTIONS': CACHE_OPTIONS,
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': os.getenv('YATUBE_CACHE_LOCATION', 'yatube_cache'),
+        'OPTIONS': CACHE_OPTIONS,
+    },
+}
+
+CACHES = {
+    'default': SHARED_CACHES[CACHE_MODE],
+    # Кэш страниц и карточек записей: LRU в памяти процесса поверх общего.
+    # Для locmem общий кэш и так в памяти процесса, второй уровень не нужен.
+    'posts': {
+        'BACKEND': 'core.cache.TwoTierCache',
+        'OPTIONS': {
+            'SHARED': 'default',
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 0 if CACHE_MODE == 'locmem' else 5,
+        },
+    },
 }
+
+# Лента подписок: записи авторов, у которых подписчиков не меньше
+# POSTS_FANOUT_LIMIT, не раскладываются по лентам, а читаются при запросе.
+POSTS_FANOUT_LIMIT = 1000
+POSTS_TIMELINE_LENGTH = 1000
+# Раскладка записи подрезает ленту подписчика в среднем раз в
+# POSTS_TIMELINE_TRIM_EVERY записей: лента бывает длиннее
+# POSTS_TIMELINE_LENGTH примерно на это число.
+POSTS_TIMELINE_TRIM_EVERY = 20
+# Сколько id подписок и подписчиков держит в памяти каждый процесс
+# (4 байта на id).
+POSTS_FOLLOW_GRAPH_MAX_IDS = 1000000
+
+# Доля запросов, для которых MetricsMiddleware собирает метрики.
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 0.1))
+# Каталог, куда каждый процесс пишет свои гистограммы, чтобы /metrics/
+# складывал их по всем воркерам. Без него /metrics/ отдаёт гистограммы
+# одного процесса, который обработал запрос.
+METRICS_DIR = os.getenv('METRICS_DIR')
+
+# Миниатюры картинок записей строятся в фоновом пуле потоков.
+POSTS_THUMBNAIL_WORKERS = 2
+# Варианты картинки карточки для srcset. WebP строится, только если
+# Pillow собран с libwebp.
+POSTS_THUMBNAIL_WIDTHS = (320, 640, 960, 1920)
+POSTS_THUMBNAIL_FORMATS = ('WEBP', 'JPEG')
+# Строить миниатюры сразу после фиксации транзакции, а не в пуле.
+POSTS_THUMBNAILS_SYNC = False
+
+# Очередь задач core.jobs: побочные действия записей выполняет команда
+# run_jobs. С JOBS_SYNC задачи выполняются сразу при постановке; при DEBUG
+# это поведение по умолчанию, чтобы runserver работал без обработчика.
+JOBS_SYNC = os.getenv('YATUBE_JOBS_SYNC', '1' if DEBUG else '0') == '1'
+JOBS_WORKERS = 4
+JOBS_BATCH_SIZE = 50
+JOBS_MAX_ATTEMPTS = 5
+# Пауза перед повтором в секундах, удваивается с каждой попыткой.
+JOBS_RETRY_DELAY = 10
+# Задача, которую обработчик держит дольше, считается брошенной.
+JOBS_LOCK_TIMEOUT = 300
+JOBS_KEEP_DONE = 24 * 60 * 60
+# Если готовая задача ждёт дольше, enqueue пишет в лог предупреждение:
+# похоже, run_jobs не запущен.
+JOBS_STALL_WARNING = 60
+
+# Поиск по записям: SQLite FTS5 или LikeBackend для других баз.
+POSTS_SEARCH_BACKEND = 'posts.search.SQLiteFTSBackend'